@@ -0,0 +1,114 @@
+#!/usr/bin/python3.9
+
+"""Compares the reminder wheel against the APScheduler job store used by JobQueue.
+
+Measures insert, cancel and fire throughput for a week of minute-aligned
+one-shot reminders. Run with: python3 bench_reminders.py [reminder_count]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+import pytz
+
+from timer_wheel import TimerWheel
+
+PRAYER_NAMES = ["fajr", "shurooq", "dhuhr", "asr", "maghrib", "isha"]
+
+
+def noop():
+    pass
+
+
+def generate_fire_times(count, start):
+    """Returns count minute-aligned fire times spread over the week after start."""
+    return [
+        start + datetime.timedelta(minutes=random.randrange(7 * 24 * 60))
+        for _ in range(count)
+    ]
+
+
+def bench_wheel(fire_times, start):
+    wheel = TimerWheel()
+
+    started = time.perf_counter()
+    reminders = [
+        wheel.insert("Singapore", PRAYER_NAMES[index % 6], None, 0, fire_time)
+        for index, fire_time in enumerate(fire_times)
+    ]
+    insert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for reminder in reminders[::2]:
+        wheel.cancel(reminder)
+    cancel_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fired = 0
+    for minute in range(7 * 24 * 60 + 1):
+        fired += len(wheel.expire(start + datetime.timedelta(minutes=minute)))
+    fire_seconds = time.perf_counter() - started
+
+    return insert_seconds, cancel_seconds, fire_seconds, fired
+
+
+def bench_jobqueue(fire_times, start):
+    # Paused, so jobs are only stored and never executed by the scheduler thread
+    scheduler = BackgroundScheduler(timezone=pytz.utc)
+    scheduler.start(paused=True)
+    jobstore = scheduler._lookup_jobstore("default")
+
+    started = time.perf_counter()
+    jobs = [
+        scheduler.add_job(noop, "date", run_date=fire_time, name=f"{index}_exact")
+        for index, fire_time in enumerate(fire_times)
+    ]
+    insert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for job in jobs[::2]:
+        job.remove()
+    cancel_seconds = time.perf_counter() - started
+
+    # Mirrors what the scheduler does on each wakeup: collect and drop due jobs
+    started = time.perf_counter()
+    fired = 0
+    for minute in range(7 * 24 * 60 + 1):
+        due_jobs = jobstore.get_due_jobs(start + datetime.timedelta(minutes=minute))
+        for job in due_jobs:
+            jobstore.remove_job(job.id)
+        fired += len(due_jobs)
+    fire_seconds = time.perf_counter() - started
+
+    scheduler.shutdown(wait=False)
+    return insert_seconds, cancel_seconds, fire_seconds, fired
+
+
+def report(name, count, results):
+    insert_seconds, cancel_seconds, fire_seconds, fired = results
+    print(f"{name}:")
+    print(
+        f"  insert: {count / insert_seconds:,.0f} reminders/s ({insert_seconds:.3f}s)"
+    )
+    print(
+        f"  cancel: {(count // 2) / cancel_seconds:,.0f} reminders/s ({cancel_seconds:.3f}s)"
+    )
+    print(f"  fire:   {fired / fire_seconds:,.0f} reminders/s ({fire_seconds:.3f}s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    start = datetime.datetime.now(pytz.utc).replace(second=0, microsecond=0)
+    random.seed(0)
+    fire_times = generate_fire_times(count, start + datetime.timedelta(minutes=1))
+
+    print(f"Benchmarking {count:,} reminders over one week")
+    report("TimerWheel", count, bench_wheel(fire_times, start))
+    report("APScheduler (JobQueue)", count, bench_jobqueue(fire_times, start))
+
+
+if __name__ == "__main__":
+    main()
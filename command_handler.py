@@ -1,28 +1,55 @@
+from telegram.constants import MAX_MESSAGE_LENGTH
 from telegram.ext import ConversationHandler
 import datetime
-import pytz
 
-from database_handler import save_user_settings, get_user_settings
-from prayers import get_prayer_times
-from reminders import schedule_prayer_times, get_upcoming_reminder
+from config import (
+    ADMIN_CHAT_IDS,
+    INTROSPECTION_HOST,
+    INTROSPECTION_PORT,
+    STATS_MESSAGE_TOP_LOCATIONS,
+    STATS_MESSAGE_TOP_MINUTES,
+)
+from database_handler import (
+    add_subscription_location,
+    get_chat_subscriptions,
+    get_user_settings,
+    remove_subscription_location,
+    reset_subscriptions,
+    save_user_settings,
+    set_prayer_opt_out,
+    set_quiet_hours,
+    set_subscription_lead_times,
+)
+from introspection import get_scheduler_stats
+from prayers import get_prayer_times, local_today
+from profiling import profiled
+from reminders import get_upcoming_reminder, refresh_subscriptions
+from subscriptions import PRAYER_NAMES
 
 # Define states for user setup process
 SET_LOCATION, SET_LEAD_TIME = range(2)
 
 
+@profiled("start")
 def start(update, context):
     welcome_message = (
         "Welcome to PrayPalBot, your Prayer Times Reminder Bot! Here's how you can use me:\n\n"
         "**/start** - Initialize PrayPalBot and set up your prayer times reminder.\n"
         "**/showsettings** - View your current settings for location, timezone offset, and lead time.\n"
         "**/todayprayertimes** - Get today's prayer times for your location.\n"
-        "**/nextsalat** - Shows the next upcoming prayer time reminder.\n\n"
+        "**/nextsalat** - Shows the next upcoming prayer time reminder.\n"
+        "**/addlocation** City - Also receive reminders for another location.\n"
+        "**/removelocation** City - Stop receiving reminders for a location.\n"
+        "**/leadtimes** 10 30 - Set one or more lead times in minutes ('none' to clear).\n"
+        "**/skipprayer** Shurooq - Stop receiving reminders for a prayer (**/unskipprayer** to undo).\n"
+        "**/quiethours** 23:00 05:00 - Mute reminders between two local times ('off' to clear).\n\n"
         "You can start by sending me your location, for example, 'Singapore'."
     )
     update.message.reply_text(welcome_message, parse_mode="Markdown")
     return SET_LOCATION
 
 
+@profiled("location_handler")
 def location_handler(update, context):
     """Handles user input for location.
 
@@ -33,13 +60,9 @@ def location_handler(update, context):
     chat_id = update.message.chat_id
     location = update.message.text.strip().title()
     save_user_settings(chat_id, location, None)
+    reset_subscriptions(chat_id, location)
 
-    schedule_prayer_times(
-        chat_id=chat_id,
-        location=location,
-        lead_time=None,
-        job_queue=context.job_queue,
-    )
+    refresh_subscriptions(chat_id, context.job_queue)
 
     update.message.reply_text(
         "Location set. If you want to receive a reminder before the exact prayer time, please send the lead time in minutes. Otherwise, send 'skip' to continue."
@@ -47,6 +70,7 @@ def location_handler(update, context):
     return SET_LEAD_TIME
 
 
+@profiled("lead_time_handler")
 def lead_time_handler(update, context):
     text = update.message.text.lower()
     if text == "skip":
@@ -72,19 +96,18 @@ def lead_time_handler(update, context):
 
     location, _ = user_settings
     save_user_settings(chat_id, location, lead_time)
-
-    schedule_prayer_times(
-        chat_id=chat_id,
-        location=location,
-        lead_time=lead_time,
-        job_queue=context.job_queue,
+    set_subscription_lead_times(
+        chat_id, [lead_time] if lead_time and lead_time > 0 else []
     )
 
+    refresh_subscriptions(chat_id, context.job_queue)
+
     update.message.reply_text(message)
 
     return ConversationHandler.END
 
 
+@profiled("show_settings")
 def show_settings(update, context):
     """Displays the user's current settings for prayer times and reminders.
 
@@ -96,17 +119,23 @@ def show_settings(update, context):
         int: ConversationHandler.END to indicate the end of the conversation.
     """
     chat_id = update.message.chat_id
-    user_settings = get_user_settings(chat_id)
-    if user_settings:
-        location, lead_time = user_settings
-        # Check if location is set within user_settings
-        if location:
+    chat_subscriptions = get_chat_subscriptions(chat_id)
+    if chat_subscriptions:
+        subscriptions, opt_outs, quiet_hours = chat_subscriptions
+        locations = sorted({location for location, _ in subscriptions})
+        lead_times = sorted({lead_time for _, lead_time in subscriptions if lead_time})
+        # Check if any location is subscribed
+        if locations:
             message = f"Your current settings:\n\n"
-            message += f"* Location: {location}\n"
-            if lead_time is not None:
-                message += f"* Lead time: {lead_time} minutes\n"
+            message += f"* Location{'s' if len(locations) > 1 else ''}: {', '.join(locations)}\n"
+            if lead_times:
+                message += f"* Lead time: {', '.join(str(lead_time) for lead_time in lead_times)} minutes\n"
             else:
                 message += "* Lead time: Not set (reminders at exact prayer time)\n"
+            if opt_outs:
+                message += f"* Skipped prayers: {', '.join(name.title() for name in sorted(opt_outs))}\n"
+            if quiet_hours:
+                message += f"* Quiet hours: {format_minute(quiet_hours[0])} to {format_minute(quiet_hours[1])}\n"
         else:
             # Location not set - inform user
             message = "You haven't set your location yet. To receive prayer times and reminders, please set your location using the /start command."
@@ -118,8 +147,9 @@ def show_settings(update, context):
     return ConversationHandler.END  # End conversation after showing settings
 
 
+@profiled("today_prayer_times")
 def today_prayer_times(update, context):
-    """Displays today's prayer times for the user's location.
+    """Displays today's prayer times for each of the user's locations.
 
     Args:
       update (Update): Update object from Telegram Bot API.
@@ -129,61 +159,58 @@ def today_prayer_times(update, context):
       None
     """
     chat_id = update.message.chat_id
-    user_settings = get_user_settings(chat_id)
-    if user_settings:
-        location, _ = user_settings
-        # Check if location is set within user_settings
-        if location:
-            response = get_prayer_times(location)
-
-            if isinstance(response, str):
-                print(f"Error getting prayer times for {location}: {response}")
-                update.message.reply_text(response)  # Display error message
-                return
-
-            # Extract prayer times from the response dictionary
-            prayer_times = response["prayer_times"]
-
-            # Today's date
-            today = datetime.datetime.now(pytz.utc).date()
-            filtered_prayer_times = None
-
-            for entry in prayer_times:
-                try:
-                    date_for = datetime.datetime.strptime(
-                        entry["date_for"], "%Y-%m-%d"
-                    ).strftime("%Y-%m-%d")
-                    if date_for == today.strftime("%Y-%m-%d"):
-                        filtered_prayer_times = {
-                            key: value
-                            for key, value in entry.items()
-                            if key != "date_for"
-                        }
-                except ValueError:
-                    pass
-
-            if filtered_prayer_times:
-                message = f"Today's prayer times for *{location}*:\n\n"
-
-                for prayer_name, time in filtered_prayer_times.items():
-                    message += f"*{prayer_name.title()}*: {time}\n"
-
-                context.bot.send_message(chat_id, text=message, parse_mode="MarkdownV2")
-            else:
-                # No prayer times found for today (potentially an API issue)
-                message = f"Could not retrieve prayer times for today ({today.strftime('%Y-%m-%d')}). Please try again later."
-                update.message.reply_text(message)
+    chat_subscriptions = get_chat_subscriptions(chat_id)
+    locations = []
+    if chat_subscriptions:
+        locations = sorted({location for location, _ in chat_subscriptions[0]})
 
-        else:
-            # Location not set - inform user
-            message = "You haven't set your location yet. To receive prayer times, please set your location using the /start command."
-            update.message.reply_text(message)
-    else:
-        # Handle case where no user settings are found
+    if not locations:
+        # Handle case where no location is subscribed
         message = "You haven't set your location or prayer time preferences yet. Use the /start command to get started!"
         update.message.reply_text(message)
+        return
+
+    for location in locations:
+        response = get_prayer_times(location)
+
+        if isinstance(response, str):
+            print(f"Error getting prayer times for {location}: {response}")
+            update.message.reply_text(response)  # Display error message
+            continue
 
+        # Extract prayer times from the response dictionary
+        prayer_times = response["prayer_times"]
 
+        # Today's date at the location
+        today = local_today(response["timezone_offset"])
+        filtered_prayer_times = None
+
+        for entry in prayer_times:
+            try:
+                date_for = datetime.datetime.strptime(
+                    entry["date_for"], "%Y-%m-%d"
+                ).strftime("%Y-%m-%d")
+                if date_for == today.strftime("%Y-%m-%d"):
+                    filtered_prayer_times = {
+                        key: value for key, value in entry.items() if key != "date_for"
+                    }
+            except ValueError:
+                pass
+
+        if filtered_prayer_times:
+            message = f"Today's prayer times for *{location}*:\n\n"
+
+            for prayer_name, time in filtered_prayer_times.items():
+                message += f"*{prayer_name.title()}*: {time}\n"
+
+            context.bot.send_message(chat_id, text=message, parse_mode="MarkdownV2")
+        else:
+            # No prayer times found for today (potentially an API issue)
+            message = f"Could not retrieve prayer times for {location} for today ({today.strftime('%Y-%m-%d')}). Please try again later."
+            update.message.reply_text(message)
+
+
+@profiled("upcoming_prayer_handler")
 def upcoming_prayer_handler(update, context):
     """
     This handler retrieves information about the upcoming prayer reminder
@@ -194,7 +221,7 @@ def upcoming_prayer_handler(update, context):
         context (Context): Context object from Telegram Bot API.
     """
     chat_id = update.message.chat_id
-    upcoming_reminder = get_upcoming_reminder(chat_id, context.job_queue)
+    upcoming_reminder = get_upcoming_reminder(chat_id)
 
     if upcoming_reminder:
         prayer_name = upcoming_reminder["prayer_name"]
@@ -203,6 +230,7 @@ def upcoming_prayer_handler(update, context):
 
         message_text = f"Your upcoming {'prayer ' if prayer_name.lower() != 'shurooq' else ''}reminder:\n\n"
         message_text += f"* {'Prayer ' if prayer_name.lower() != 'shurooq' else ''}Name: {prayer_name.title()}\n"
+        message_text += f"* Location: {upcoming_reminder['location']}\n"
         message_text += f"* Scheduled Time: {scheduled_time}\n"
         message_text += f"* Time Remaining: {time_remaining}\n"
 
@@ -211,3 +239,227 @@ def upcoming_prayer_handler(update, context):
         # Handle case where no upcoming reminder is found
         message_text = "You don't have any upcoming prayer reminders. Use the /start command to get started!"
         context.bot.send_message(chat_id, text=message_text)
+
+
+@profiled("scheduler_stats_handler")
+def scheduler_stats_handler(update, context):
+    """Sends aggregated reminder scheduler statistics to admin users.
+
+    Only the busiest locations and minutes are listed to stay within
+    Telegram's message length limit, the HTTP endpoint serves the full view.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    chat_id = update.message.chat_id
+    if chat_id not in ADMIN_CHAT_IDS:
+        update.message.reply_text("This command is only available to admins.")
+        return
+
+    stats = get_scheduler_stats()
+
+    message = f"Subscribed chats: {stats['subscribed_chats']}\n"
+    message += f"Pending reminders: {stats['pending']}\n\n"
+
+    by_location = sorted(
+        stats["by_location"].items(),
+        key=lambda item: sum(item[1].values()),
+        reverse=True,
+    )
+    message += f"Top locations ({len(by_location)} in total):\n"
+    for location, prayers in by_location[:STATS_MESSAGE_TOP_LOCATIONS]:
+        counts = ", ".join(f"{name} {count}" for name, count in prayers.items())
+        message += f"* {location}: {counts}\n"
+
+    upcoming = [entry for entry in stats["next_minutes"] if entry["count"]]
+    message += f"\nDue in the next {len(stats['next_minutes'])} minutes:\n"
+    for entry in upcoming[:STATS_MESSAGE_TOP_MINUTES]:
+        message += f"* {entry['minute']}: {entry['count']}\n"
+    if len(upcoming) > STATS_MESSAGE_TOP_MINUTES:
+        message += (
+            f"* ... and {len(upcoming) - STATS_MESSAGE_TOP_MINUTES} more minutes\n"
+        )
+    if not upcoming:
+        message += "* None\n"
+
+    busiest_minute = stats["busiest_minute"]
+    if busiest_minute:
+        message += f"\nBusiest minute: {busiest_minute['count']} reminders at {busiest_minute['minute']}\n"
+
+    message += f"Misfires: {stats['misfires']}\n"
+    oldest_misfire = stats["oldest_misfire"]
+    if oldest_misfire:
+        message += (
+            f"Oldest misfire: {oldest_misfire['prayer_name']} in {oldest_misfire['location']} "
+            f"at {oldest_misfire['fire_time']} ({oldest_misfire['late_seconds']}s late)\n"
+        )
+
+    if INTROSPECTION_PORT:
+        message += f"\nFull statistics: http://{INTROSPECTION_HOST}:{INTROSPECTION_PORT}/stats\n"
+
+    # Location names are user input and may still be long
+    context.bot.send_message(chat_id, text=message[:MAX_MESSAGE_LENGTH])
+
+
+def format_minute(minute):
+    """Formats minutes after midnight as HH:MM."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def parse_minute(text):
+    """Parses an HH:MM time into minutes after midnight, None if invalid."""
+    try:
+        time = datetime.datetime.strptime(text, "%H:%M")
+    except ValueError:
+        return None
+    return time.hour * 60 + time.minute
+
+
+@profiled("add_location_handler")
+def add_location_handler(update, context):
+    """Subscribes the user to reminders for another location, e.g. /addlocation London.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    chat_id = update.message.chat_id
+    location = " ".join(context.args).strip().title()
+    if not location:
+        update.message.reply_text("Please send a location, e.g. /addlocation London")
+        return
+
+    response = get_prayer_times(location)
+    if isinstance(response, str):
+        update.message.reply_text(response)  # Display error message
+        return
+
+    add_subscription_location(chat_id, location)
+    refresh_subscriptions(chat_id, context.job_queue)
+    update.message.reply_text(f"You will also receive reminders for {location}.")
+
+
+@profiled("remove_location_handler")
+def remove_location_handler(update, context):
+    """Unsubscribes the user from a location, e.g. /removelocation London.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    chat_id = update.message.chat_id
+    location = " ".join(context.args).strip().title()
+
+    if not location or not remove_subscription_location(chat_id, location):
+        update.message.reply_text(
+            "You are not subscribed to that location. Use /showsettings to see your locations."
+        )
+        return
+
+    refresh_subscriptions(chat_id, context.job_queue)
+    update.message.reply_text(f"You will no longer receive reminders for {location}.")
+
+
+@profiled("lead_times_handler")
+def lead_times_handler(update, context):
+    """Sets the lead times used for all of the user's locations, e.g. /leadtimes 10 30.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    chat_id = update.message.chat_id
+    if [arg.lower() for arg in context.args] == ["none"]:
+        lead_times = []
+    else:
+        try:
+            lead_times = sorted({int(arg) for arg in context.args})
+        except ValueError:
+            lead_times = None
+
+        if not lead_times or lead_times[0] <= 0:
+            update.message.reply_text(
+                "Please send one or more lead times in minutes, e.g. /leadtimes 10 30, or /leadtimes none."
+            )
+            return
+
+    set_subscription_lead_times(chat_id, lead_times)
+    refresh_subscriptions(chat_id, context.job_queue)
+
+    if lead_times:
+        message = f"Lead times set to {', '.join(str(lead_time) for lead_time in lead_times)} minutes."
+    else:
+        message = (
+            "Lead times cleared. Reminders will be sent at the exact prayer times."
+        )
+    update.message.reply_text(message)
+
+
+def prayer_opt_out_handler(update, context, opted_out):
+    chat_id = update.message.chat_id
+    prayer_name = " ".join(context.args).strip().lower()
+    if prayer_name not in PRAYER_NAMES:
+        update.message.reply_text(
+            f"Please send one of {', '.join(name.title() for name in PRAYER_NAMES)}."
+        )
+        return
+
+    set_prayer_opt_out(chat_id, prayer_name, opted_out)
+    refresh_subscriptions(chat_id, context.job_queue)
+
+    if opted_out:
+        message = f"You will no longer receive reminders for {prayer_name.title()}."
+    else:
+        message = f"You will receive reminders for {prayer_name.title()} again."
+    update.message.reply_text(message)
+
+
+@profiled("skip_prayer_handler")
+def skip_prayer_handler(update, context):
+    """Opts the user out of the reminders for a prayer, e.g. /skipprayer Shurooq.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    prayer_opt_out_handler(update, context, True)
+
+
+@profiled("unskip_prayer_handler")
+def unskip_prayer_handler(update, context):
+    """Opts the user back into the reminders for a prayer, e.g. /unskipprayer Shurooq.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    prayer_opt_out_handler(update, context, False)
+
+
+@profiled("quiet_hours_handler")
+def quiet_hours_handler(update, context):
+    """Sets the user's quiet hours, e.g. /quiethours 23:00 05:00 or /quiethours off.
+
+    Quiet hours are in the local time of each reminder's location.
+
+    Args:
+        update (Update): Update object from Telegram Bot API.
+        context (Context): Context object from Telegram Bot API.
+    """
+    chat_id = update.message.chat_id
+    if [arg.lower() for arg in context.args] == ["off"]:
+        quiet_hours = None
+        message = "Quiet hours cleared."
+    else:
+        quiet_hours = tuple(parse_minute(arg) for arg in context.args)
+        if len(quiet_hours) != 2 or None in quiet_hours:
+            update.message.reply_text(
+                "Please send a start and end time, e.g. /quiethours 23:00 05:00, or /quiethours off."
+            )
+            return
+        message = f"No reminders will be sent between {context.args[0]} and {context.args[1]} local time."
+
+    set_quiet_hours(chat_id, quiet_hours)
+    refresh_subscriptions(chat_id, context.job_queue)
+    update.message.reply_text(message)
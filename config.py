@@ -1,2 +1,59 @@
+import os
+
 DATABASE_NAME = "praypalbot.db"
 LOG_FILENAME = "praypalbot.log"
+# Base URL of the prayer times API, point this at a local stub for load tests
+MUSLIMSALAT_API_URL = "https://muslimsalat.com"
+# Minimum level of records that are logged ("DEBUG", "INFO", "WARNING", "ERROR")
+LOG_LEVEL = "INFO"
+# Fraction of records kept per event type, events not listed are always kept
+LOG_SAMPLE_RATES = {
+    "reminder_scheduled": 0.01,
+    "reminder_skipped": 0.01,
+    "reminder_deleted": 0.01,
+    "location_scheduled": 0.01,
+}
+
+# Period of prayer times fetched per API request: "weekly", "monthly" or "yearly"
+PRAYER_TIMES_PERIOD = "monthly"
+# Refetch a location once fewer than this many days are left in its cached range
+PRAYER_TIMES_REFRESH_DAYS = 3
+# Number of days ahead that reminders are scheduled for
+REMINDER_HORIZON_DAYS = 7
+# Reminders sent later than this after their time are treated as missed
+MISFIRE_GRACE_SECONDS = 300
+# What to do with missed reminders: "coalesce" into one message per user or "drop"
+MISFIRE_POLICY = "coalesce"
+# On startup, replay reminders that fell due within this many minutes and were
+# not yet handed out by the dispatcher before the restart
+CATCH_UP_MINUTES = 10
+# On startup, reminders due within this many minutes are restored before the rest
+STARTUP_PRIORITY_MINUTES = 60
+
+# Chat IDs allowed to use admin commands such as /schedulerstats
+ADMIN_CHAT_IDS = []
+# Local HTTP endpoint serving scheduler statistics as JSON, None to disable
+INTROSPECTION_HOST = "127.0.0.1"
+INTROSPECTION_PORT = 8080
+# Number of upcoming minutes covered by the scheduler statistics histogram
+STATS_HISTOGRAM_MINUTES = 60
+# Locations and busy minutes listed by /schedulerstats, the HTTP endpoint lists all
+STATS_MESSAGE_TOP_LOCATIONS = 10
+STATS_MESSAGE_TOP_MINUTES = 10
+
+# Profiling of the rebuild, command handlers and reminder sends, also enabled
+# by setting the PRAYPALBOT_PROFILING environment variable to 1
+PROFILING_ENABLED = os.environ.get("PRAYPALBOT_PROFILING") == "1"
+# Fraction of calls that are profiled while profiling is enabled
+PROFILING_SAMPLE_RATE = float(os.environ.get("PRAYPALBOT_PROFILING_SAMPLE_RATE", 0.1))
+# Directory the profiling reports are written to
+PROFILING_DIR = "profiles"
+
+# SMTP server used for error emails, point this at a local server for testing
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_STARTTLS = True
+# Seconds to wait on the SMTP server before giving up on a connection or command
+SMTP_TIMEOUT_SECONDS = 30
+# Error alerts are deduplicated and sent as one digest email per interval (seconds)
+ALERT_DIGEST_SECONDS = 300
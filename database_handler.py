@@ -6,8 +6,10 @@ def get_db_connection():
     """Establishes a connection to the SQLite database."""
     conn = sqlite3.connect(DATABASE_NAME)
 
-    # Create table if it doesn't exist
+    # Create tables if they don't exist
     create_user_settings_table(conn)
+    create_subscription_tables(conn)
+    create_bot_state_table(conn)
 
     return conn, conn.cursor()
 
@@ -31,6 +33,109 @@ def create_user_settings_table(conn):
     conn.commit()
 
 
+def create_subscription_tables(conn):
+    """Creates the subscription tables in the database if they don't exist.
+
+    A chat subscribes to reminders per location and lead time, a lead_time of 0
+    stands for the reminder at the exact prayer time. Prayers a chat opted out
+    of and its quiet hours (minutes after local midnight) are kept per chat.
+    When the subscriptions table is first created it is filled from user_settings.
+    """
+    c = conn.cursor()
+    c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'subscriptions'"
+    )
+    migrate = c.fetchone() is None
+
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS subscriptions (
+                chat_id INTEGER NOT NULL,
+                location TEXT NOT NULL,
+                lead_time INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (chat_id, location, lead_time)
+            )"""
+    )
+    c.execute(
+        """CREATE INDEX IF NOT EXISTS subscriptions_by_location
+                ON subscriptions (location, lead_time)"""
+    )
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS prayer_opt_outs (
+                chat_id INTEGER NOT NULL,
+                prayer_name TEXT NOT NULL,
+                PRIMARY KEY (chat_id, prayer_name)
+            )"""
+    )
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS quiet_hours (
+                chat_id INTEGER PRIMARY KEY,
+                start_minute INTEGER NOT NULL,
+                end_minute INTEGER NOT NULL
+            )"""
+    )
+
+    if migrate:
+        # Active users keep their exact time reminder and their lead time, if any
+        c.execute(
+            """INSERT OR IGNORE INTO subscriptions (chat_id, location, lead_time)
+                     SELECT chat_id, location, 0 FROM user_settings
+                     WHERE location IS NOT NULL AND location != ''
+                     AND (lead_time IS NULL OR lead_time != -1)"""
+        )
+        c.execute(
+            """INSERT OR IGNORE INTO subscriptions (chat_id, location, lead_time)
+                     SELECT chat_id, location, lead_time FROM user_settings
+                     WHERE location IS NOT NULL AND location != '' AND lead_time > 0"""
+        )
+    conn.commit()
+
+
+def create_bot_state_table(conn):
+    """Creates the bot_state table, holding named values that outlive restarts."""
+    c = conn.cursor()
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS bot_state (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            )"""
+    )
+    conn.commit()
+
+
+def get_bot_state(name):
+    """Retrieves a value saved with set_bot_state, None if it was never saved."""
+    conn, c = get_db_connection()
+
+    try:
+        c.execute("SELECT value FROM bot_state WHERE name = ?", (name,))
+        row = c.fetchone()
+        value = row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Error getting bot state: {e}")
+        value = None  # Indicate error by returning None
+
+    finally:
+        close_db_connection(conn)
+
+    return value
+
+
+def set_bot_state(name, value):
+    """Saves a named value that outlives restarts."""
+    conn, c = get_db_connection()
+
+    try:
+        c.execute(
+            "INSERT OR REPLACE INTO bot_state (name, value) VALUES (?, ?)",
+            (name, str(value)),
+        )
+    except sqlite3.Error as e:
+        print(f"Error setting bot state: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+
 def save_user_settings(chat_id, location, lead_time):
     """Saves user settings to the database."""
     conn, c = get_db_connection()
@@ -87,9 +192,195 @@ def get_all_chat_ids():
     return chat_ids
 
 
+def get_all_subscriptions():
+    """Retrieves the subscription data of all chats in one connection.
+
+    Returns:
+        tuple or None: (chat_id, location, lead_time) subscription rows,
+                       (chat_id, prayer_name) opt-out rows and
+                       (chat_id, start_minute, end_minute) quiet hours rows.
+    """
+    conn, c = get_db_connection()
+
+    try:
+        c.execute("SELECT chat_id, location, lead_time FROM subscriptions")
+        subscriptions = c.fetchall()
+        c.execute("SELECT chat_id, prayer_name FROM prayer_opt_outs")
+        opt_outs = c.fetchall()
+        c.execute("SELECT chat_id, start_minute, end_minute FROM quiet_hours")
+        quiet_hours = c.fetchall()
+        all_subscriptions = (subscriptions, opt_outs, quiet_hours)
+    except sqlite3.Error as e:
+        print(f"Error getting all subscriptions: {e}")
+        all_subscriptions = None  # Indicate error by returning None
+
+    finally:
+        close_db_connection(conn)
+
+    return all_subscriptions
+
+
+def get_chat_subscriptions(chat_id):
+    """Retrieves the subscription data of a chat.
+
+    Returns:
+        tuple or None: (location, lead_time) subscription rows ordered by
+                       location and lead time, the names of the prayers the
+                       chat opted out of and its (start_minute, end_minute)
+                       quiet hours or None.
+    """
+    conn, c = get_db_connection()
+
+    try:
+        c.execute(
+            """SELECT location, lead_time FROM subscriptions WHERE chat_id = ?
+                     ORDER BY location, lead_time""",
+            (chat_id,),
+        )
+        subscriptions = c.fetchall()
+        c.execute(
+            "SELECT prayer_name FROM prayer_opt_outs WHERE chat_id = ?", (chat_id,)
+        )
+        opt_outs = [row[0] for row in c.fetchall()]
+        c.execute(
+            "SELECT start_minute, end_minute FROM quiet_hours WHERE chat_id = ?",
+            (chat_id,),
+        )
+        chat_subscriptions = (subscriptions, opt_outs, c.fetchone())
+    except sqlite3.Error as e:
+        print(f"Error getting subscriptions: {e}")
+        chat_subscriptions = None  # Indicate error by returning None
+
+    finally:
+        close_db_connection(conn)
+
+    return chat_subscriptions
+
+
+def reset_subscriptions(chat_id, location):
+    """Replaces all subscriptions of a chat with the exact time reminders for location."""
+    conn, c = get_db_connection()
+
+    try:
+        c.execute("DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
+        c.execute(
+            "INSERT INTO subscriptions (chat_id, location, lead_time) VALUES (?, ?, 0)",
+            (chat_id, location),
+        )
+    except sqlite3.Error as e:
+        print(f"Error resetting subscriptions: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+
+def add_subscription_location(chat_id, location):
+    """Subscribes a chat to a location with the lead times of its other locations."""
+    conn, c = get_db_connection()
+
+    try:
+        c.execute(
+            """INSERT OR IGNORE INTO subscriptions (chat_id, location, lead_time)
+                     SELECT ?, ?, 0
+                     UNION SELECT DISTINCT chat_id, ?, lead_time FROM subscriptions
+                     WHERE chat_id = ?""",
+            (chat_id, location, location, chat_id),
+        )
+    except sqlite3.Error as e:
+        print(f"Error adding subscription: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+
+def remove_subscription_location(chat_id, location):
+    """Unsubscribes a chat from a location. Returns True if it was subscribed."""
+    conn, c = get_db_connection()
+    removed = False
+
+    try:
+        c.execute(
+            "DELETE FROM subscriptions WHERE chat_id = ? AND location = ?",
+            (chat_id, location),
+        )
+        removed = c.rowcount > 0
+    except sqlite3.Error as e:
+        print(f"Error removing subscription: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+    return removed
+
+
+def set_subscription_lead_times(chat_id, lead_times):
+    """Replaces the lead times (in minutes) used for every location of a chat."""
+    conn, c = get_db_connection()
+
+    try:
+        c.execute(
+            "DELETE FROM subscriptions WHERE chat_id = ? AND lead_time != 0",
+            (chat_id,),
+        )
+        c.executemany(
+            """INSERT OR IGNORE INTO subscriptions (chat_id, location, lead_time)
+                     SELECT DISTINCT chat_id, location, ? FROM subscriptions
+                     WHERE chat_id = ?""",
+            [(lead_time, chat_id) for lead_time in lead_times],
+        )
+    except sqlite3.Error as e:
+        print(f"Error setting lead times: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+
+def set_prayer_opt_out(chat_id, prayer_name, opted_out):
+    """Opts a chat out of (or back into) the reminders for a prayer."""
+    conn, c = get_db_connection()
+
+    try:
+        if opted_out:
+            c.execute(
+                "INSERT OR IGNORE INTO prayer_opt_outs (chat_id, prayer_name) VALUES (?, ?)",
+                (chat_id, prayer_name),
+            )
+        else:
+            c.execute(
+                "DELETE FROM prayer_opt_outs WHERE chat_id = ? AND prayer_name = ?",
+                (chat_id, prayer_name),
+            )
+    except sqlite3.Error as e:
+        print(f"Error setting prayer opt-out: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+
+def set_quiet_hours(chat_id, quiet_hours):
+    """Saves the (start_minute, end_minute) quiet hours of a chat, None clears them."""
+    conn, c = get_db_connection()
+
+    try:
+        if quiet_hours is None:
+            c.execute("DELETE FROM quiet_hours WHERE chat_id = ?", (chat_id,))
+        else:
+            c.execute(
+                """INSERT OR REPLACE INTO quiet_hours (chat_id, start_minute, end_minute)
+                         VALUES (?, ?, ?)""",
+                (chat_id, *quiet_hours),
+            )
+    except sqlite3.Error as e:
+        print(f"Error setting quiet hours: {e}")
+
+    finally:
+        close_db_connection(conn)
+
+
 def deactivate_user(chat_id):
     """
-    Marks a user as inactive in the database based on chat ID.
+    Marks a user as inactive in the database based on chat ID and removes
+    their subscriptions.
     """
     conn, c = get_db_connection()
     try:
@@ -97,6 +388,7 @@ def deactivate_user(chat_id):
         c.execute(
             f"UPDATE user_settings SET lead_time = -1 WHERE chat_id = {chat_id}"
         )  # Set lead_time to -1
+        c.execute("DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
     except sqlite3.Error as err:
         print(f"Error deactivating user: {err}")
     finally:
@@ -0,0 +1,77 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import json
+import threading
+
+from config import STATS_HISTOGRAM_MINUTES
+from reminders import reminder_wheel, subscriber_index
+from utils import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_scheduler_stats(histogram_minutes=STATS_HISTOGRAM_MINUTES):
+    """Returns aggregated statistics about the pending prayer reminders.
+
+    Args:
+        histogram_minutes (int): Number of upcoming minutes in the histogram.
+
+    Returns:
+        dict: See TimerWheel.stats, plus the number of subscribed chats.
+    """
+    stats = reminder_wheel.stats(histogram_minutes=histogram_minutes)
+    stats["subscribed_chats"] = subscriber_index.chat_count()
+    return stats
+
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET /stats[?minutes=N] as JSON."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/stats":
+            self.send_error(404)
+            return
+
+        try:
+            minutes = int(
+                parse_qs(url.query).get("minutes", [STATS_HISTOGRAM_MINUTES])[0]
+            )
+        except ValueError:
+            self.send_error(400, "minutes must be an integer")
+            return
+
+        body = json.dumps(get_scheduler_stats(max(0, min(minutes, 24 * 60)))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def start_introspection_server(host, port):
+    """Starts the statistics HTTP endpoint on a background thread.
+
+    Args:
+        host (str): The address to bind to, keep this local.
+        port (int): The port to listen on.
+
+    Returns:
+        ThreadingHTTPServer or None: The running server, or None if it could not be started.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), StatsRequestHandler)
+    except OSError as e:
+        logger.error("Error starting introspection server on %s:%s: %s", host, port, e)
+        return None
+
+    thread = threading.Thread(
+        target=server.serve_forever, name="IntrospectionServer", daemon=True
+    )
+    thread.start()
+    logger.info("Introspection server listening on http://%s:%s/stats", host, port)
+    return server
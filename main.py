@@ -1,5 +1,10 @@
 #!/usr/bin/python3.9
 
+import time
+
+# Measured before the other imports so that the startup timings include them
+startup_started = time.perf_counter()
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from telegram.ext import (
     Updater,
@@ -7,12 +12,12 @@ from telegram.ext import (
     CommandHandler,
     Filters,
     MessageHandler,
+    TypeHandler,
 )
-import pytz
 import telegram
-import time
+import threading
 
-from utils import logging
+from utils import log_event, logging
 
 from command_handler import (
     SET_LOCATION,
@@ -23,10 +28,79 @@ from command_handler import (
     show_settings,
     today_prayer_times,
     upcoming_prayer_handler,
+    scheduler_stats_handler,
+    add_location_handler,
+    remove_location_handler,
+    lead_times_handler,
+    skip_prayer_handler,
+    unskip_prayer_handler,
+    quiet_hours_handler,
+)
+from config import (
+    CATCH_UP_MINUTES,
+    INTROSPECTION_HOST,
+    INTROSPECTION_PORT,
+    STARTUP_PRIORITY_MINUTES,
 )
 from credentials import TELEGRAM_BOT_TOKEN
-from reminders import reinitialize_reminders
-from send_email import send_email
+from database_handler import close_db_connection, get_db_connection
+from introspection import get_scheduler_stats, start_introspection_server
+from reminders import (
+    get_replay_start,
+    reinitialize_reminders,
+    start_reminder_dispatcher,
+)
+from send_email import send_alert
+
+startup_logger = logging.getLogger("startup")
+
+
+def log_startup_phase(phase):
+    """Logs how long after process start the given startup phase completed."""
+    log_event(
+        startup_logger,
+        logging.INFO,
+        "startup_phase",
+        f"Startup phase {phase} completed.",
+        phase=phase,
+        seconds=round(time.perf_counter() - startup_started, 3),
+    )
+
+
+def first_update_recorder():
+    """Returns an update callback that logs when the first update was served.
+
+    Registered in a group after the command handlers, which run synchronously,
+    so it is called once the first update has been handled.
+    """
+    served = threading.Event()
+
+    def record_first_update(update, context):
+        if not served.is_set():
+            served.set()
+            log_startup_phase("first_update_served")
+
+    return record_first_update
+
+
+def restore_reminders(updater, replay_start):
+    """Restores reminders after startup, run on a background thread."""
+    try:
+        reinitialize_reminders(
+            updater,
+            catch_up_minutes=CATCH_UP_MINUTES,
+            priority_minutes=STARTUP_PRIORITY_MINUTES,
+            replay_start=replay_start,
+        )
+    except Exception as e:
+        logging.getLogger(__name__).exception("Error restoring reminders")
+        # Nothing else reports errors raised on this thread
+        send_alert(
+            "PrayPalBot Reminder Restore Error",
+            f"Restoring reminders after startup failed: {e}",
+        )
+        return
+    log_startup_phase("reminders_restored")
 
 
 def start_scheduler(scheduler, logger):
@@ -38,17 +112,20 @@ def start_scheduler(scheduler, logger):
         logger.error(f"Error starting scheduler: {e}")
 
 
-def get_active_jobs(scheduler):
-    """Prints information about currently active jobs in the scheduler, showing next run time in Singapore Time (SGT)."""
-    print("Active Jobs:")
-    for job in scheduler.get_jobs():
-        # Extract job name and next run time
-        job_name = job.name
-        next_run_time = job.next_run_time.astimezone(pytz.timezone("Asia/Singapore"))
-        next_run_time_str = next_run_time.strftime("%Y-%m-%d %H:%M:%S (SGT)")
-        # Format the message and print directly
-        message = f"- Name: {job_name}, Next Run (SGT): {next_run_time_str}"
-        print(message)
+def log_scheduler_stats(logger):
+    """Logs a summary of the pending reminders without listing individual jobs."""
+    stats = get_scheduler_stats(histogram_minutes=60)
+    log_event(
+        logger,
+        logging.INFO,
+        "scheduler_stats",
+        "Scheduler statistics.",
+        pending=stats["pending"],
+        locations=len(stats["by_location"]),
+        due_next_hour=sum(entry["count"] for entry in stats["next_minutes"]),
+        busiest_minute=stats["busiest_minute"],
+        misfires=stats["misfires"],
+    )
 
 
 def handle_telegram_error(update, context):
@@ -67,7 +144,45 @@ def handle_read_timeout_error(update, context, updater):
         updater.start_polling()
 
 
+def register_handlers(dp):
+    """Registers the conversation and command handlers on the dispatcher."""
+    # Set up conversation handler with the states
+    conv_handler = ConversationHandler(
+        entry_points=[CommandHandler("start", start)],
+        states={
+            SET_LOCATION: [
+                MessageHandler(Filters.text & ~Filters.command, location_handler)
+            ],
+            SET_LEAD_TIME: [
+                MessageHandler(Filters.text & ~Filters.command, lead_time_handler)
+            ],
+        },
+        fallbacks=[
+            CommandHandler("start", start),
+        ],
+    )
+
+    dp.add_handler(conv_handler)
+    dp.add_handler(CommandHandler("showsettings", show_settings))
+    dp.add_handler(CommandHandler("nextsalat", upcoming_prayer_handler))
+    dp.add_handler(CommandHandler("todayprayertimes", today_prayer_times))
+    dp.add_handler(CommandHandler("schedulerstats", scheduler_stats_handler))
+    dp.add_handler(CommandHandler("addlocation", add_location_handler))
+    dp.add_handler(CommandHandler("removelocation", remove_location_handler))
+    dp.add_handler(CommandHandler("leadtimes", lead_times_handler))
+    dp.add_handler(CommandHandler("skipprayer", skip_prayer_handler))
+    dp.add_handler(CommandHandler("unskipprayer", unskip_prayer_handler))
+    dp.add_handler(CommandHandler("quiethours", quiet_hours_handler))
+
+
 def main():
+    log_startup_phase("imports")
+
+    # Open the database once so schema creation is not paid by the first command
+    conn, _ = get_db_connection()
+    close_db_connection(conn)
+    log_startup_phase("database_open")
+
     updater = Updater(TELEGRAM_BOT_TOKEN, use_context=True)
     dp = updater.dispatcher
 
@@ -87,53 +202,54 @@ def main():
     )
 
     scheduler.add_job(
-        get_active_jobs,
+        log_scheduler_stats,
         "cron",
-        args=(scheduler,),  # Pass scheduler as argument
+        args=(logging.getLogger(__name__),),
         hour="*",  # Run every hour
         day_of_week="*",
         timezone="UTC",
     )
     start_scheduler(scheduler, logging.getLogger(__name__))
 
-    # Re-initialize reminders on startup
-    reinitialize_reminders(updater)
+    # Serve aggregated scheduler statistics locally
+    if INTROSPECTION_PORT is not None:
+        start_introspection_server(INTROSPECTION_HOST, INTROSPECTION_PORT)
 
-    # Set up conversation handler with the states
-    conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
-        states={
-            SET_LOCATION: [
-                MessageHandler(Filters.text & ~Filters.command, location_handler)
-            ],
-            SET_LEAD_TIME: [
-                MessageHandler(Filters.text & ~Filters.command, lead_time_handler)
-            ],
-        },
-        fallbacks=[
-            CommandHandler("start", start),
-        ],
-    )
+    # Reminders sent before the restart are not replayed, read this before the
+    # dispatcher's first tick overwrites it
+    replay_start = get_replay_start()
 
-    dp.add_handler(conv_handler)
-    dp.add_handler(CommandHandler("showsettings", show_settings))
-    dp.add_handler(CommandHandler("nextsalat", upcoming_prayer_handler))
-    dp.add_handler(CommandHandler("todayprayertimes", today_prayer_times))
+    # Fire due reminders from the reminder wheel once a minute
+    start_reminder_dispatcher(updater.job_queue)
+
+    register_handlers(dp)
+    dp.add_handler(TypeHandler(telegram.Update, first_update_recorder()), group=1)
 
     try:
         updater.start_polling()
+        log_startup_phase("polling_started")
+
+        # Re-initialize reminders in the background so commands are served right
+        # away, replaying the ones missed while down and the soonest ones first
+        threading.Thread(
+            target=restore_reminders,
+            args=(updater, replay_start),
+            name="ReminderRestore",
+            daemon=True,
+        ).start()
+
         updater.idle()
     except telegram.error.NetworkError as e:
         print(f"Network error: {e}")
         # Send email notification for network error
-        send_email(
+        send_alert(
             "PrayPalBot Network Error",
             f"Network error encountered: {e}",
         )
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         # Send email notification for general exception
-        send_email(
+        send_alert(
             "PrayPalBot Error",
             f"An error occurred: {e}",
         )
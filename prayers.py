@@ -1,43 +1,154 @@
+from dateutil import parser
 from json import JSONDecodeError
 from requests.exceptions import RequestException
 
+import bisect
+import datetime
 import requests
 
+from config import MUSLIMSALAT_API_URL, PRAYER_TIMES_PERIOD, PRAYER_TIMES_REFRESH_DAYS
 from credentials import MUSLIMSALAT_API_KEY
-from utils import prayer_time_cache
+from utils import logging, prayer_time_cache
 
+logger = logging.getLogger(__name__)
 
-def get_prayer_times(location):
+PRAYER_TIMES_PERIODS = ("weekly", "monthly", "yearly")
+
+
+def parse_date_for(date_for):
+    """Parses a "date_for" value from the API (e.g. "2024-5-12") into a date."""
+    return datetime.datetime.strptime(date_for, "%Y-%m-%d").date()
+
+
+def parse_timezone(timezone_offset):
+    """Returns the timezone for an API offset in hours such as "8" or "5.5" (UTC if invalid)."""
+    try:
+        offset = datetime.timedelta(hours=float(timezone_offset))
+    except (TypeError, ValueError):
+        offset = datetime.timedelta(0)
+    return datetime.timezone(offset)
+
+
+def local_today(timezone_offset):
+    """Returns today's date at the given UTC offset in hours (UTC if invalid)."""
+    return datetime.datetime.now(parse_timezone(timezone_offset)).date()
+
+
+def build_prayer_instants(prayer_data):
     """
-    Fetches prayer times and timezone information for the given location,
-    using caching for improved performance.
+    Builds the table of prayer instants used to look up the next prayer.
+
+    Args:
+        prayer_data (dict): Prayer times and timezone data as returned by get_prayer_times.
+
+    Returns:
+        tuple: A sorted list of UTC timestamps and the list of matching prayer names.
+    """
+    offset_timezone = parse_timezone(prayer_data["timezone_offset"])
+    instants = []
+    for day_prayer_times in prayer_data["prayer_times"]:
+        prayer_date = day_prayer_times["date_for"]
+        for prayer_name, prayer_time in day_prayer_times.items():
+            if prayer_name == "date_for":
+                continue
+            prayer_datetime = parser.parse(f"{prayer_date} {prayer_time}").replace(
+                tzinfo=offset_timezone
+            )
+            instants.append((prayer_datetime.timestamp(), prayer_name))
+
+    instants.sort()
+    return [instant for instant, _ in instants], [name for _, name in instants]
+
+
+def get_next_prayer(location, now=None, skip_prayers=()):
+    """
+    Finds the first prayer after now for the given location by binary search
+    over the cached prayer instants, independent of any scheduled reminders.
 
     Args:
         location (str): The user's location (e.g., "Singapore").
+        now (datetime, optional): Aware datetime to search from. Defaults to now.
+        skip_prayers (collection): Prayer names to pass over (e.g. {"shurooq"}).
 
     Returns:
-        dict or str: A dictionary containing prayer times and timezone data
-                    if successful, or an error message string if an error occurred.
+        dict, str or None: The prayer_name and the prayer_time as an aware datetime
+                           in the location's timezone, an error message string if
+                           the prayer times could not be retrieved, or None if the
+                           cached range holds no later prayer.
+    """
+    prayer_data = get_prayer_times(location)
+    if isinstance(prayer_data, str):
+        return prayer_data
+
+    # Built once per fetch by get_prayer_times
+    timestamps, prayer_names = prayer_data["prayer_instants"]
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+    index = bisect.bisect_right(timestamps, now.timestamp())
+    while index < len(timestamps) and prayer_names[index] in skip_prayers:
+        index += 1
+    if index == len(timestamps):
+        return None
+
+    offset_timezone = parse_timezone(prayer_data["timezone_offset"])
+    return {
+        "prayer_name": prayer_names[index],
+        "prayer_time": datetime.datetime.fromtimestamp(
+            timestamps[index], offset_timezone
+        ),
+    }
+
+
+def is_cache_valid(cached_data):
+    """
+    Checks whether cached prayer times still cover enough days ahead.
+
+    A range the API could not extend any further (see get_prayer_times) is
+    kept for the rest of the day it was fetched on, as long as it covers today.
+
+    Args:
+        cached_data (dict): A cache entry as stored by get_prayer_times.
+
+    Returns:
+        bool: True if at least PRAYER_TIMES_REFRESH_DAYS days (including today)
+              are left in the cached date range.
+    """
+    today = local_today(cached_data["timezone_offset"])
+    days_left = (cached_data["valid_until"] - today).days + 1
+    if days_left >= PRAYER_TIMES_REFRESH_DAYS:
+        return True
+    return days_left >= 1 and cached_data.get("fetched_on") == today
+
+
+def fetch_prayer_times(location, period, start_date):
+    """
+    Requests a period of prayer times starting at start_date from the API.
+
+    Args:
+        location (str): The user's location (e.g., "Singapore").
+        period (str): "weekly", "monthly" or "yearly".
+        start_date (date): The first day to request.
+
+    Returns:
+        dict or str: The prayer times, timezone offset and the last day covered
+                     (valid_until), or an error message string.
     """
     generic_error_message = (
         "Encountered an error while retrieving data. Please try again later."
     )
 
-    # Check cache for existing data
-    cached_data = prayer_time_cache.get(location)
-    if cached_data:
-        return cached_data
-
     try:
         response = requests.get(
-            f"https://muslimsalat.com/{location}/weekly.json?key={MUSLIMSALAT_API_KEY}"
+            f"{MUSLIMSALAT_API_URL}/{location}/{period}/{start_date:%d-%m-%Y}.json"
+            f"?key={MUSLIMSALAT_API_KEY}"
         )
         response.raise_for_status()  # Raise exception for non-200 status codes
 
         # Check for successful response based on API structure
         if response.json()["status_valid"] != 1 or response.json()["status_code"] != 1:
             api_error = response.json().get("status_error", {}).get("invalid_query")
-            print(f"API error for location {location}: {api_error}")
+            logger.warning("API error for location %s: %s", location, api_error)
 
             # Directly return the invalid_query if it exists
             if api_error:
@@ -45,21 +156,82 @@ def get_prayer_times(location):
 
         prayer_times = response.json()["items"]
         timezone_offset = response.json()["timezone"]
-
-        # Cache the successful response
-        prayer_time_cache[location] = {
-            "prayer_times": prayer_times,
-            "timezone_offset": timezone_offset,
-        }
-
-        return {
-            "prayer_times": prayer_times,
-            "timezone_offset": timezone_offset,
-        }
     except RequestException as e:
-        print(f"Error getting prayer times for location {location}: {e}")
+        logger.error("Error getting prayer times for location %s: %s", location, e)
         # Consider providing a more specific error message to the user here
         return generic_error_message
     except JSONDecodeError as e:
-        print(f"Error decoding JSON response for location {location}: {e}")
+        logger.error("Error decoding JSON response for location %s: %s", location, e)
         return generic_error_message
+
+    # The response is reused until the last day it covers
+    try:
+        valid_until = max(parse_date_for(entry["date_for"]) for entry in prayer_times)
+    except (KeyError, ValueError):
+        logger.warning("Invalid date range in API response for location %s.", location)
+        return generic_error_message
+
+    return {
+        "prayer_times": prayer_times,
+        "timezone_offset": timezone_offset,
+        "valid_until": valid_until,
+    }
+
+
+def get_prayer_times(location):
+    """
+    Fetches prayer times and timezone information for the given location,
+    using caching for improved performance.
+
+    The API is queried for PRAYER_TIMES_PERIOD worth of days starting today and
+    the result is reused until its "date_for" range is about to run out. Should
+    the period end too soon (calendar periods end at month or year end), the
+    following period is fetched and merged in. If a refetch fails, the cached
+    prayer times are returned for as long as they last. Every returned payload
+    is cached together with its sorted table of prayer instants.
+
+    Args:
+        location (str): The user's location (e.g., "Singapore").
+
+    Returns:
+        dict or str: A dictionary containing prayer times and timezone data
+                    if successful, or an error message string if an error occurred.
+    """
+    # Check cache for existing data
+    cached_data = prayer_time_cache.get(location)
+    if cached_data and is_cache_valid(cached_data):
+        return cached_data
+
+    period = (
+        PRAYER_TIMES_PERIOD if PRAYER_TIMES_PERIOD in PRAYER_TIMES_PERIODS else "weekly"
+    )
+
+    # Start a day early, the location's date may still be yesterday in UTC
+    start_date = datetime.datetime.now(datetime.timezone.utc).date()
+    start_date -= datetime.timedelta(days=1)
+
+    data = fetch_prayer_times(location, period, start_date)
+    if isinstance(data, str):
+        if cached_data:
+            logger.warning("Using stale prayer times for location %s.", location)
+            return cached_data
+        return data
+
+    if not is_cache_valid(data):
+        next_data = fetch_prayer_times(
+            location, period, data["valid_until"] + datetime.timedelta(days=1)
+        )
+        if isinstance(next_data, dict):
+            known_dates = {entry["date_for"] for entry in data["prayer_times"]}
+            data["prayer_times"] += [
+                entry
+                for entry in next_data["prayer_times"]
+                if entry["date_for"] not in known_dates
+            ]
+            data["valid_until"] = max(data["valid_until"], next_data["valid_until"])
+
+    data["fetched_on"] = local_today(data["timezone_offset"])
+    # Lets get_next_prayer binary search without parsing the prayer times
+    data["prayer_instants"] = build_prayer_instants(data)
+    prayer_time_cache[location] = data
+    return data
@@ -0,0 +1,134 @@
+from functools import wraps
+
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from config import PROFILING_DIR, PROFILING_ENABLED, PROFILING_SAMPLE_RATE
+from utils import logging
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def profiled(name):
+    """Decorator that profiles a sample of calls when profiling is enabled.
+
+    Sampled calls run under cProfile with tracemalloc tracing, and a report is
+    written to PROFILING_DIR. When profiling is disabled the function is
+    returned unchanged, so there is no overhead.
+
+    Args:
+        name (str): Name used for the report files, e.g. "reinitialize_reminders".
+    """
+
+    def decorator(func):
+        if not PROFILING_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # cProfile only supports one active profiler per thread
+            sampled = random.random() < PROFILING_SAMPLE_RATE
+            if not sampled or getattr(_local, "active", False):
+                return func(*args, **kwargs)
+            return _run_profiled(name, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+    return tracemalloc.take_snapshot()
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    snapshot = tracemalloc.take_snapshot()
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+    return snapshot
+
+
+def _run_profiled(name, func, args, kwargs):
+    _local.active = True
+    profiler = cProfile.Profile()
+    start_snapshot = _start_tracemalloc()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    finally:
+        elapsed = time.perf_counter() - started
+        end_snapshot = _stop_tracemalloc()
+        _local.active = False
+        try:
+            write_report(name, profiler, start_snapshot, end_snapshot, elapsed)
+        except OSError as e:
+            logger.error("Error writing profiling report for %s: %s", name, e)
+
+
+def write_report(name, profiler, start_snapshot, end_snapshot, elapsed):
+    """Writes the cProfile stats and a text summary of a profiled call to disk.
+
+    Args:
+        name (str): Name of the profiled function.
+        profiler (cProfile.Profile): The profiler that ran the call.
+        start_snapshot (tracemalloc.Snapshot): Snapshot taken before the call.
+        end_snapshot (tracemalloc.Snapshot): Snapshot taken after the call.
+        elapsed (float): Wall clock duration of the call in seconds.
+
+    Returns:
+        str: Path of the text report.
+    """
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime(
+        "%Y%m%dT%H%M%S%fZ"
+    )
+    base_path = os.path.join(
+        PROFILING_DIR, f"{name}-{timestamp}-{threading.get_ident()}"
+    )
+
+    profiler.dump_stats(f"{base_path}.prof")
+
+    report = io.StringIO()
+    report.write(f"{name} took {elapsed:.3f}s\n\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+
+    # tracemalloc cannot tell threads apart, so other threads allocating while
+    # the call ran are included, only tracemalloc's own allocations are left out
+    report.write(
+        "Top memory allocations while the call ran "
+        "(process-wide, including other threads):\n"
+    )
+    snapshot_filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    end_snapshot = end_snapshot.filter_traces(snapshot_filters)
+    start_snapshot = start_snapshot.filter_traces(snapshot_filters)
+    for stat in end_snapshot.compare_to(start_snapshot, "lineno")[:20]:
+        report.write(f"{stat}\n")
+
+    with open(f"{base_path}.txt", "w") as f:
+        f.write(report.getvalue())
+
+    logger.info("Wrote profiling report for %s to %s.txt", name, base_path)
+    return f"{base_path}.txt"
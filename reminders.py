@@ -4,55 +4,153 @@ from dateutil import parser
 
 import pytz
 import telegram
-import uuid
-
-from database_handler import deactivate_user, get_all_chat_ids, get_user_settings
-from prayers import get_prayer_times
+import threading
+import time
+
+from config import (
+    MISFIRE_GRACE_SECONDS,
+    MISFIRE_POLICY,
+    REMINDER_HORIZON_DAYS,
+)
+from database_handler import (
+    deactivate_user,
+    get_all_subscriptions,
+    get_bot_state,
+    get_chat_subscriptions,
+    set_bot_state,
+)
+from prayers import get_next_prayer, get_prayer_times, parse_date_for, parse_timezone
+from profiling import profiled
+from subscriptions import SubscriberIndex
+from timer_wheel import TimerWheel, bucket_start, minute_bucket
+from utils import log_event, logging
+
+logger = logging.getLogger(__name__)
+
+REMINDER_DISPATCHER_JOB_NAME = "ReminderDispatcher"
+# bot_state entry holding the UTC minute index of the last dispatcher tick
+LAST_DISPATCHED_MINUTE_STATE = "last_dispatched_minute"
 
 last_execution_time = None
 
+# Pending reminders for all locations, fired by the dispatcher job once a minute
+reminder_wheel = TimerWheel(misfire_seconds=MISFIRE_GRACE_SECONDS)
+
+# Chats subscribed to each reminder, kept in sync with the subscription tables
+subscriber_index = SubscriberIndex()
+# Held while database rows are read into the subscriber index, so a full
+# reload can't overwrite a chat refreshed after the reload's snapshot was read
+subscriber_index_lock = threading.Lock()
+
+# One lock per location, held while its reminders are rescheduled
+location_locks = {}
+location_locks_lock = threading.Lock()
+
+
+def get_location_lock(location):
+    """Returns the lock that serializes rescheduling the given location."""
+    with location_locks_lock:
+        return location_locks.setdefault(location, threading.Lock())
+
+
+def schedule_prayer_times(
+    location,
+    job_queue,
+    catch_up_minutes=0,
+    not_before=None,
+    not_after=None,
+    replace=True,
+):
+    """Schedules the prayer reminders of a location for the next REMINDER_HORIZON_DAYS days.
+
+    One reminder is scheduled per prayer and lead time that has subscribers at
+    the location, however many chats are subscribed. The recipients are looked
+    up in the subscriber index when the reminder fires.
 
-def schedule_prayer_times(chat_id, location, lead_time, job_queue):
-    """Schedules prayer reminders for the entire week, excluding inactive users.
+    Command handlers, the startup restore and the nightly rebuild may schedule
+    the same location concurrently, so each location is scheduled under its
+    own lock.
 
     Args:
-        chat_id (str): The user's chat ID.
-        location (str): The user's location.
-        lead_time (int): The lead time in minutes for reminders (optional).
+        location (str): The location to schedule reminders for.
         job_queue: The job queue to schedule reminders.
+        catch_up_minutes (int): Also schedule reminders that fell due within this
+            many minutes, they are sent on the next dispatcher tick.
+        not_before (datetime, optional): Skip reminders due before this time.
+        not_after (datetime, optional): Skip reminders due at or after this time.
+        replace (bool): Delete the location's existing reminders first. Pass False
+            to add a further time window to reminders scheduled earlier, nothing
+            is added if reminders due at or after not_before are already pending
+            (the location was fully rescheduled meanwhile).
+
+    Returns:
+        int: The number of reminders scheduled.
     """
+    with get_location_lock(location):
+        if not replace and not_before is not None:
+            if any(
+                reminder.fire_time >= not_before
+                for reminder in reminder_wheel.pending_for_location(location)
+            ):
+                return 0
+
+        return _schedule_prayer_times(
+            location,
+            job_queue,
+            catch_up_minutes=catch_up_minutes,
+            not_before=not_before,
+            not_after=not_after,
+            replace=replace,
+        )
 
-    if lead_time == -1:  # Check if lead_time is the inactive flag
-        # User has been deactivated, skipping user.
-        print(f"User with ID {chat_id} has been deactivaed. Skipping user.")
-        return
+
+def _schedule_prayer_times(
+    location, job_queue, catch_up_minutes, not_before, not_after, replace
+):
+    reminder_keys = subscriber_index.reminder_keys(location)
+    if not reminder_keys:
+        # Nobody is subscribed to this location any more
+        if replace:
+            delete_existing_reminders(location)
+        return 0
 
     response = get_prayer_times(location)
 
     if isinstance(response, str):
-        print(f"Error getting prayer times for {location}: {response}")
-        return
+        logger.warning("Error getting prayer times for %s: %s", location, response)
+        return 0
 
-    # Extract prayer times and check for missing data
+    # Extract prayer times and check for missing data, offsets can be fractional (e.g. 5.5)
     try:
-        timezone_offset = int(response.get("timezone_offset"))
+        timezone_offset = float(response.get("timezone_offset"))
     except (TypeError, ValueError):
-        print(f"Invalid timezone offset in API response for {location}.")
+        logger.warning("Invalid timezone offset in API response for %s.", location)
         timezone_offset = 0
 
     if not timezone_offset:
-        print(f"Timezone offset missing in API response for {location}.")
+        logger.debug("Timezone offset missing in API response for %s.", location)
         timezone_offset = 0
 
-    offset_timezone = datetime.timezone(datetime.timedelta(hours=timezone_offset))
+    offset_timezone = parse_timezone(timezone_offset)
     current_time = datetime.datetime.now(offset_timezone)
-    delete_existing_reminders(job_queue, chat_id)
+    horizon_date = current_time.date() + timedelta(days=REMINDER_HORIZON_DAYS)
+    earliest_time = current_time - timedelta(minutes=catch_up_minutes)
+    if not_before is not None:
+        earliest_time = max(earliest_time, not_before)
+    start_reminder_dispatcher(job_queue)
+    if replace:
+        delete_existing_reminders(location)
+    scheduled = skipped = 0
 
     for day_data in response["prayer_times"]:
         # Extract prayer times for the current day
         day_prayer_times = day_data
         prayer_date = day_prayer_times["date_for"]
 
+        # Monthly and yearly payloads cover more days than are scheduled at once
+        if parse_date_for(prayer_date) >= horizon_date:
+            continue
+
         for prayer_name, prayer_time in day_prayer_times.items():
             if prayer_name == "date_for":
                 continue
@@ -60,81 +158,294 @@ def schedule_prayer_times(chat_id, location, lead_time, job_queue):
             # Construct datetime object for the prayer time
             datetime_str = f"{prayer_date} {prayer_time}"
             naive_datetime = parser.parse(datetime_str)
-            adjusted_prayer_time = naive_datetime.replace(tzinfo=offset_timezone)
-
-            # Check for past prayer times
-            if adjusted_prayer_time < current_time:
-                print(
-                    f"Prayer time for {prayer_name} on {prayer_date} has already passed. Skipping schedule."
+            # The reminder wheel is bucketed by UTC minute
+            adjusted_prayer_time = naive_datetime.replace(
+                tzinfo=offset_timezone
+            ).astimezone(pytz.utc)
+
+            # Exact prayer time (lead_time None) and lead time reminders
+            for key_prayer_name, lead_time in reminder_keys:
+                if key_prayer_name != prayer_name:
+                    continue
+
+                fire_time = adjusted_prayer_time
+                if lead_time:
+                    fire_time -= timedelta(minutes=lead_time)
+
+                # Check for past reminders
+                if fire_time < earliest_time:
+                    skipped += 1
+                    log_event(
+                        logger,
+                        logging.DEBUG,
+                        "reminder_skipped",
+                        "Reminder time has already passed. Skipping schedule.",
+                        location=location,
+                        prayer_name=prayer_name,
+                        lead_time=lead_time,
+                        prayer_date=prayer_date,
+                    )
+                    continue
+
+                if not_after is not None and fire_time >= not_after:
+                    continue
+
+                reminder = reminder_wheel.insert(
+                    location,
+                    prayer_name,
+                    lead_time,
+                    timezone_offset,
+                    fire_time,
+                )
+                scheduled += 1
+                log_event(
+                    logger,
+                    logging.DEBUG,
+                    "reminder_scheduled",
+                    "Scheduled prayer reminder.",
+                    location=location,
+                    prayer_name=prayer_name,
+                    lead_time=lead_time,
+                    fire_time=fire_time,
+                    reminder_id=reminder.reminder_id,
                 )
-                continue
 
-            # Assuming job_queue uses UTC by default
-            adjusted_prayer_time = adjusted_prayer_time.astimezone(pytz.utc)
-
-            # Base job ID using chat_id, prayer_name, date, timezone offset, and lead time (if set)
-            base_job_id = f"{chat_id}_{prayer_name}_{prayer_date}_{timezone_offset}_{uuid.uuid4()}"
-            if lead_time:
-                base_job_id += f"_{lead_time}"  # Append lead time if present
-
-            # Schedule reminders
-            # - Exact Prayer Time Reminder
-            job_queue.run_once(
-                send_prayer_reminder,
-                adjusted_prayer_time,
-                context={
-                    "chat_id": chat_id,
-                    "lead_time": None,
-                    "prayer_name": prayer_name,
-                },
-                name=f"{base_job_id}_exact",
-            )
-            print(
-                f"Scheduled exact prayer reminder for {prayer_name} on {prayer_date} at {adjusted_prayer_time} (Job ID: {base_job_id}_exact)"
-            )
+    log_event(
+        logger,
+        logging.DEBUG,
+        "location_scheduled",
+        "Scheduled prayer reminders.",
+        location=location,
+        scheduled=scheduled,
+        skipped=skipped,
+    )
+    return scheduled
 
-            # - Lead Time Reminder (Optional)
-            if lead_time:
-                lead_prayer_time = adjusted_prayer_time - timedelta(minutes=lead_time)
-                job_queue.run_once(
-                    send_prayer_reminder,
-                    lead_prayer_time,
-                    context={
-                        "chat_id": chat_id,
-                        "lead_time": lead_time,
-                        "prayer_name": prayer_name,
-                    },
-                    name=f"{base_job_id}_lead",
-                )
-                print(
-                    f"Scheduled lead time reminder for {prayer_name} on {prayer_date} at {lead_prayer_time} (Job ID: {base_job_id}_lead)"
-                )
 
+def delete_existing_reminders(location):
+    """Deletes all pending reminders of the given location from the reminder wheel.
+
+    Args:
+        location (str): The location whose reminders should be removed.
+    """
+    deleted = reminder_wheel.cancel_location(location)
+    if deleted:
+        log_event(
+            logger,
+            logging.DEBUG,
+            "reminder_deleted",
+            "Deleted existing reminders.",
+            location=location,
+            deleted=deleted,
+        )
+
+
+def refresh_subscriptions(chat_id, job_queue):
+    """Reloads a chat's subscriptions into the subscriber index.
+
+    Only locations whose set of reminders changed are rescheduled, a chat
+    subscribing to reminders that other chats already receive costs nothing
+    on the reminder wheel.
+
+    Args:
+        chat_id (int): The chat whose subscriptions were changed in the database.
+        job_queue: The job queue to schedule reminders.
+    """
+    with subscriber_index_lock:
+        chat_subscriptions = get_chat_subscriptions(chat_id)
+        if chat_subscriptions is None:
+            return
+        locations = subscriber_index.replace_chat(chat_id, *chat_subscriptions)
+
+    for location in locations:
+        schedule_prayer_times(location, job_queue)
+
+
+def unsubscribe_blocked_chat(chat_id):
+    """Deactivates a chat that blocked the bot and drops it from the subscriber index.
+
+    Reminders left without subscribers are skipped when they fire and are not
+    scheduled again by the next reinitialization.
+    """
+    logger.info("User with ID %s has blocked the bot. Deactivating user.", chat_id)
+    with subscriber_index_lock:
+        deactivate_user(chat_id)
+        subscriber_index.remove_chat(chat_id)
+
+
+def start_reminder_dispatcher(job_queue):
+    """Registers the job that fires due reminders at the start of every minute.
+
+    The job is only added once, so it is safe to call this repeatedly.
+
+    Args:
+        job_queue: The job queue to run the dispatcher on.
+    """
+    if job_queue.get_jobs_by_name(REMINDER_DISPATCHER_JOB_NAME):
+        return
+
+    next_minute = datetime.datetime.now(pytz.utc).replace(
+        second=0, microsecond=0
+    ) + timedelta(minutes=1)
+    job_queue.run_repeating(
+        dispatch_due_reminders,
+        interval=60,
+        first=next_minute,
+        name=REMINDER_DISPATCHER_JOB_NAME,
+        # A late tick still runs once, the wheel hands it everything it missed
+        job_kwargs={"misfire_grace_time": None, "coalesce": True},
+    )
+
+
+def dispatch_due_reminders(context):
+    """Sends the due reminders and records the tick, see send_due_reminders.
+
+    Args:
+        context (CallbackContext): The job callback context.
+    """
+    now = datetime.datetime.now(pytz.utc)
+    send_due_reminders(context, now)
+
+    # Everything due up to this minute has been handed out, don't replay it
+    set_bot_state(LAST_DISPATCHED_MINUTE_STATE, minute_bucket(now))
+
+
+def get_replay_start():
+    """Returns the start of the first minute the last dispatcher tick did not cover.
+
+    Read it on startup before the dispatcher ticks for the first time.
+
+    Returns:
+        datetime or None: Aware UTC datetime, or None if no tick was recorded.
+    """
+    last_dispatched_minute = get_bot_state(LAST_DISPATCHED_MINUTE_STATE)
+    if last_dispatched_minute is None:
+        return None
+    return bucket_start(int(last_dispatched_minute) + 1)
+
+
+def send_due_reminders(context, now):
+    """Expires every due reminder and sends it to its subscribers, applying the misfire policy.
+
+    The recipients of each reminder are its subscriber set, minus the chats
+    whose quiet hours cover the reminder's local time. Reminders more than
+    MISFIRE_GRACE_SECONDS late are not sent as usual. With the "coalesce"
+    policy each user gets a single message listing the prayers they missed
+    (lead time reminders are dropped), with "drop" they are discarded. The
+    backlog size and the time until every send has finished are logged.
+
+    Args:
+        context (CallbackContext): The job callback context.
+        now (datetime): Aware UTC datetime of the tick.
+    """
+    due_reminders = reminder_wheel.expire(now)
+    if not due_reminders:
+        return
+
+    grace = timedelta(seconds=MISFIRE_GRACE_SECONDS)
+    sends = []
+    missed_by_chat = {}
+    late = dropped = quiet = 0
+    for reminder in due_reminders:
+        chat_ids = subscriber_index.subscribers(
+            reminder.location, reminder.prayer_name, reminder.lead_time
+        )
+        local_time = reminder.fire_time.astimezone(
+            parse_timezone(reminder.timezone_offset)
+        )
+        is_late = now - reminder.fire_time > grace
+        if is_late:
+            late += 1
+
+        for chat_id in chat_ids:
+            if subscriber_index.is_quiet(chat_id, local_time):
+                quiet += 1
+            elif not is_late:
+                sends.append((send_prayer_reminder, (context.bot, chat_id, reminder)))
+            elif MISFIRE_POLICY == "coalesce" and reminder.lead_time is None:
+                missed_by_chat.setdefault(chat_id, []).append(reminder)
+            else:
+                dropped += 1
+
+    for chat_id, missed in missed_by_chat.items():
+        sends.append((send_missed_reminders, (context.bot, chat_id, missed)))
+
+    stats = {
+        "backlog": len(due_reminders),
+        "late": late,
+        "dropped": dropped,
+        "quiet": quiet,
+        "coalesced_messages": len(missed_by_chat),
+        "sends": len(sends),
+    }
+    log_event(
+        logger,
+        logging.WARNING if late else logging.INFO,
+        "reminders_dispatched",
+        "Dispatched due reminders.",
+        **stats,
+    )
+    if not sends:
+        return
 
-def delete_existing_reminders(job_queue, chat_id):
-    """Deletes existing jobs that start with the given chat ID from the job queue.
+    run_send = drain_reporter(len(sends), stats)
+    for func, args in sends:
+        context.dispatcher.run_async(run_send, func, *args)
+
+
+def drain_reporter(count, stats):
+    """Returns a wrapper that runs a send and logs the drain time once count sends have finished.
+
+    The wrapper never raises: a failed send (e.g. RetryAfter or NetworkError)
+    is logged and counted, so one failure neither stops the batch nor keeps
+    the drain time from being logged.
 
     Args:
-        job_queue: The apscheduler job queue to use (potentially unused).
-        chat_id (int): The chat ID to match at the beginning of the job name.
+        count (int): Number of sends in the batch.
+        stats (dict): Backlog statistics of the batch, included in the log record.
     """
-    for job in job_queue.scheduler.get_jobs():  # Using scheduler.get_jobs
-        if job.name.startswith(f"{chat_id}_"):
-            job.remove()
-            print(f"Deleted existing job: {job.name}")
+    started = time.perf_counter()
+    lock = threading.Lock()
+    remaining = [count]
+    failed = [0]
+
+    def run_send(func, *args):
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Error sending reminder with %s.", func.__name__)
+            with lock:
+                failed[0] += 1
+        finally:
+            with lock:
+                remaining[0] -= 1
+                done = not remaining[0]
+            if done:
+                log_event(
+                    logger,
+                    logging.WARNING if failed[0] else logging.INFO,
+                    "reminders_drained",
+                    "Finished sending due reminders.",
+                    drain_seconds=round(time.perf_counter() - started, 3),
+                    failed=failed[0],
+                    **stats,
+                )
 
+    return run_send
 
-def send_prayer_reminder(context):
+
+@profiled("send_prayer_reminder")
+def send_prayer_reminder(bot, chat_id, reminder):
     """Sends a prayer reminder message to the user.
 
     Args:
-        context (JobExecutionContext): The job execution context containing chat ID, prayer name, and optional lead time.
+        bot (telegram.Bot): The bot used to send the message.
+        chat_id (int): The chat ID of the user.
+        reminder (Reminder): The expired reminder containing location, prayer name, and optional lead time.
     """
 
-    job = context.job
-    chat_id = job.context["chat_id"]
-    prayer_name = job.context.get("prayer_name")
-    lead_time = job.context.get("lead_time")
+    prayer_name = reminder.prayer_name
+    lead_time = reminder.lead_time
 
     if lead_time:  # Check if lead_time exists
         message = f"Reminder: It's almost "
@@ -145,27 +456,72 @@ def send_prayer_reminder(context):
     else:
         message = f"It's {('Shurooq time.' if prayer_name.lower() == 'shurooq' else f'time for {prayer_name.title()} prayer.')}"
 
+    # Tell apart the reminders of users subscribed to several locations
+    if subscriber_index.location_count(chat_id) > 1:
+        message += f" ({reminder.location})"
+
     try:
-        context.bot.send_message(chat_id, text=message)
+        bot.send_message(chat_id, text=message)
     except telegram.error.Unauthorized as e:
         # User has blocked the bot, deactivate user from database
-        print(f"User with ID {chat_id} has blocked the bot. Deactivating user.")
-        deactivate_user(chat_id)
+        unsubscribe_blocked_chat(chat_id)
 
 
-def reinitialize_reminders(updater):
-    """Reinitializes all prayer reminders based on user settings in the database."""
+@profiled("send_missed_reminders")
+def send_missed_reminders(bot, chat_id, reminders):
+    """Sends a single message listing the prayer reminders a user missed.
 
-    current_time = datetime.datetime.now().astimezone(pytz.utc)
-
-    # Print current SGT time
-    print(
-        "Reinitializing reminders at",
-        current_time.astimezone(pytz.timezone("Asia/Singapore")).strftime(
-            "%H:%M:%S %Z"
-        ),
+    Args:
+        bot (telegram.Bot): The bot used to send the message.
+        chat_id (int): The chat ID of the user.
+        reminders (list): The missed exact prayer time reminders, earliest first.
+    """
+    show_location = subscriber_index.location_count(chat_id) > 1
+    prayer_names = []
+    for reminder in reminders:
+        prayer_name = reminder.prayer_name.title()
+        if show_location:
+            prayer_name += f" ({reminder.location})"
+        if prayer_name not in prayer_names:
+            prayer_names.append(prayer_name)
+
+    message = (
+        f"Sorry, PrayPalBot was unavailable and missed your "
+        f"reminder{'s' if len(prayer_names) > 1 else ''} for {' and '.join(prayer_names)}."
     )
 
+    try:
+        bot.send_message(chat_id, text=message)
+    except telegram.error.Unauthorized:
+        # User has blocked the bot, deactivate user from database
+        unsubscribe_blocked_chat(chat_id)
+
+
+@profiled("reinitialize_reminders")
+def reinitialize_reminders(
+    updater, catch_up_minutes=0, priority_minutes=0, replay_start=None
+):
+    """Reloads the subscriber index from the database and reschedules every location.
+
+    Args:
+        updater (Updater): The bot's updater.
+        catch_up_minutes (int): Also replay reminders that fell due within this
+            many minutes, used on startup to recover from downtime.
+        priority_minutes (int): If set, first schedule the reminders due within
+            this many minutes for every location, then the remaining ones, so the
+            soonest reminders are in place before the whole rebuild finishes.
+        replay_start (datetime, optional): Don't replay reminders due before
+            this time, they were sent before the restart (see get_replay_start).
+
+    Returns:
+        dict or None: Counts of subscribed chats, locations and scheduled reminders
+                      and the elapsed time in seconds, or None if reinitialization
+                      was skipped.
+    """
+
+    current_time = datetime.datetime.now().astimezone(pytz.utc)
+    logger.info("Reinitializing reminders at %s", current_time.isoformat())
+
     global last_execution_time
 
     if last_execution_time is None or (current_time - last_execution_time) >= timedelta(
@@ -174,114 +530,125 @@ def reinitialize_reminders(updater):
         # First execution or at least 3 days since last execution
         last_execution_time = current_time  # Update last execution time
     else:
-        print("Skipping reinitialization (less than 3 days since last execution).")
-        return
-
-    # Get all chat IDs
-    chat_ids = get_all_chat_ids()
-
-    for chat_id in chat_ids:
-        print(f"Processing chat ID: {chat_id}")  # Print chat ID being processed
-
-        user_settings = get_user_settings(chat_id)
+        logger.info(
+            "Skipping reinitialization (less than 3 days since last execution)."
+        )
+        return None
 
-        if not user_settings:
-            print(
-                f"Skipping chat ID {chat_id}: No user settings found"
-            )  # Print reason for skipping
-            continue
+    started = time.perf_counter()
+    job_queue = updater.dispatcher.job_queue
+
+    # Get all subscriptions in one connection
+    with subscriber_index_lock:
+        all_subscriptions = get_all_subscriptions()
+        if all_subscriptions is not None:
+            subscriber_index.load(*all_subscriptions)
+
+    locations = subscriber_index.locations()
+    stats = {
+        "chats": subscriber_index.chat_count(),
+        "locations": len(locations),
+        "reminders": 0,
+    }
+
+    priority_cutoff = None
+    if priority_minutes:
+        priority_cutoff = current_time + timedelta(minutes=priority_minutes)
+
+    for location in locations:
+        stats["reminders"] += schedule_prayer_times(
+            location,
+            job_queue,
+            catch_up_minutes=catch_up_minutes,
+            not_before=replay_start,
+            not_after=priority_cutoff,
+        )
 
-        location, lead_time = user_settings
-        schedule_prayer_times(
-            chat_id, location, lead_time, updater.dispatcher.job_queue
+    if priority_cutoff is not None:
+        stats["priority_seconds"] = round(time.perf_counter() - started, 3)
+        log_event(
+            logger,
+            logging.INFO,
+            "priority_reminders_restored",
+            "Reminders due soonest are scheduled.",
+            **stats,
         )
 
-    print("Reminder reinitialization complete!")  # Print completion message
+        for location in locations:
+            # Skipped for locations rescheduled by a subscription change meanwhile
+            stats["reminders"] += schedule_prayer_times(
+                location,
+                job_queue,
+                not_before=priority_cutoff,
+                replace=False,
+            )
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    log_event(
+        logger,
+        logging.INFO,
+        "reminders_reinitialized",
+        "Reminder reinitialization complete!",
+        **stats,
+    )
+    return stats
 
 
-def get_upcoming_reminder(chat_id, job_queue):
+def get_upcoming_reminder(chat_id):
     """
-    This function retrieves information about the upcoming scheduled prayer reminder
-    for the given chat ID, considering both exact and lead time reminders.
+    This function retrieves information about the next prayer time across the
+    given chat ID's locations, skipping the prayers the user opted out of,
+    looked up in the cached prayer times so it does not depend on reminders
+    being scheduled.
 
     Args:
         chat_id (int): The chat ID of the user.
-        job_queue (apscheduler.schedulers.base.BaseScheduler):
-            The APScheduler job queue to use.
 
     Returns:
         dict or None:
-            A dictionary containing details about the upcoming reminder
-            (prayer_name, scheduled_time, lead_time_minutes, timezone_offset)
-            if found, otherwise None.
+            A dictionary containing details about the upcoming prayer
+            (prayer_name, location, scheduled_time, time_remaining) if found,
+            otherwise None.
     """
-    upcoming_job = None
-
-    matching_jobs = [
-        job
-        for job in job_queue.scheduler.get_jobs()
-        if job.name.startswith(f"{chat_id}_") and job.name.endswith("_exact")
-    ]
-
-    if matching_jobs:
-        # Find job with earliest next_run_time using a custom key function
-        upcoming_job = min(matching_jobs, key=lambda job: job.next_run_time)
-    else:
-        upcoming_job = None
-
-    # Now upcoming_job holds the job with the earliest next_run_time
-
-    if upcoming_job:
-        # Extract information from job name
-        job_name_parts = upcoming_job.name.split("_")
-
-        # Check for minimum expected parts (including potential lead time)
-        if len(job_name_parts) < 6:
-            return None  # Invalid format
-
-        prayer_name = job_name_parts[1]  # Assuming prayer name is the second part
-        timezone_offset = None  # Initialize timezone_offset
-
-        # Extract timezone offset
-        if len(job_name_parts) > 3:
-            try:
-                # Attempt to convert the part before potential lead time (assuming timezone offset)
-                timezone_offset = int(job_name_parts[3])
-            except ValueError:
-                # If conversion fails, ignore and keep timezone_offset as None
-                pass
-
-        # Construct scheduled time with timezone offset (if available)
-        offset_timezone = (
-            pytz.utc
-            if timezone_offset is None
-            else datetime.timezone(datetime.timedelta(hours=timezone_offset))
-        )
+    chat_subscriptions = get_chat_subscriptions(chat_id)
+    if not chat_subscriptions:
+        return None
 
-        scheduled_time = upcoming_job.next_run_time.astimezone(offset_timezone)
-        scheduled_time_str = scheduled_time.strftime("%H:%M:%S %Z (%a)")
+    subscriptions, opt_outs, _ = chat_subscriptions
+    next_prayer = None
+    for location in {location for location, _ in subscriptions}:
+        candidate = get_next_prayer(location, skip_prayers=opt_outs)
+        if not isinstance(candidate, dict):
+            continue
+        if next_prayer is None or candidate["prayer_time"] < next_prayer["prayer_time"]:
+            next_prayer = dict(candidate, location=location)
 
-        # Calculate time difference
-        now = datetime.datetime.now(offset_timezone)
-        time_remaining = scheduled_time - now
+    if next_prayer is None:  # No location subscribed or no prayer times available
+        return None
 
-        # Format time remaining (considering negative values for past prayers)
-        if time_remaining < timedelta(seconds=0):  # Prayer time has already passed
-            time_remaining_str = "Prayer time has already passed."
-        else:
-            days = time_remaining.days
-            hours = time_remaining.seconds // 3600 % 24
-            minutes = time_remaining.seconds // 60 % 60
-            time_remaining_str = format_time_remaining_natural(days, hours, minutes)
+    prayer_name = next_prayer["prayer_name"]
+    scheduled_time = next_prayer["prayer_time"]
+    scheduled_time_str = scheduled_time.strftime("%H:%M:%S %Z (%a)")
 
-        return {
-            "prayer_name": prayer_name,
-            "scheduled_time": scheduled_time_str,
-            "time_remaining": time_remaining_str,
-        }
+    # Calculate time difference
+    now = datetime.datetime.now(scheduled_time.tzinfo)
+    time_remaining = scheduled_time - now
 
+    # Format time remaining (considering negative values for past prayers)
+    if time_remaining < timedelta(seconds=0):  # Prayer time has already passed
+        time_remaining_str = "Prayer time has already passed."
     else:
-        return None
+        days = time_remaining.days
+        hours = time_remaining.seconds // 3600 % 24
+        minutes = time_remaining.seconds // 60 % 60
+        time_remaining_str = format_time_remaining_natural(days, hours, minutes)
+
+    return {
+        "prayer_name": prayer_name,
+        "location": next_prayer["location"],
+        "scheduled_time": scheduled_time_str,
+        "time_remaining": time_remaining_str,
+    }
 
 
 # Function to format time remaining in a more natural language way (optional)
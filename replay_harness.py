@@ -0,0 +1,301 @@
+#!/usr/bin/python3.9
+
+"""Load tests the command handlers without touching Telegram or muslimsalat.com.
+
+Builds the real Dispatcher with the handlers from main.py, backed by a fake
+Bot transport, a local muslimsalat stub and a temporary database, then feeds
+it generated or recorded update streams and reports per-command latency
+percentiles and throughput.
+
+Run with: python3 replay_harness.py [--users N] [--rate R] [--concurrency C]
+          [--updates recorded_updates.jsonl]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+import config
+
+PERIOD_DAYS = {"weekly": 7, "monthly": 31, "yearly": 366}
+LOCATIONS = ["Singapore", "Jakarta", "Kuala Lumpur", "London", "Cairo"]
+
+
+class MuslimSalatStubHandler(BaseHTTPRequestHandler):
+    """Answers /<location>/<period>/<dd-mm-yyyy>.json with generated prayer times."""
+
+    latency = 0.0
+
+    def do_GET(self):
+        _, period, start_date = self.path.split("?")[0].strip("/").split("/")
+        start = datetime.datetime.strptime(
+            start_date.replace(".json", ""), "%d-%m-%Y"
+        ).date()
+        items = [
+            {
+                "date_for": f"{day.year}-{day.month}-{day.day}",
+                "fajr": "5:43 am",
+                "shurooq": "7:02 am",
+                "dhuhr": "1:05 pm",
+                "asr": "4:26 pm",
+                "maghrib": "7:07 pm",
+                "isha": "8:19 pm",
+            }
+            for day in (
+                start + datetime.timedelta(days=offset)
+                for offset in range(PERIOD_DAYS.get(period, 7))
+            )
+        ]
+        body = json.dumps(
+            {"status_valid": 1, "status_code": 1, "timezone": "8", "items": items}
+        ).encode()
+
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_muslimsalat_stub(latency):
+    """Starts the muslimsalat stub on a free local port and returns its base URL."""
+    MuslimSalatStubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MuslimSalatStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def configure(api_latency):
+    """Points the bot at the stub, a temporary database and a temporary log file.
+
+    Must run before the bot modules are imported, they read config on import.
+    """
+    work_dir = tempfile.mkdtemp(prefix="praypalbot-harness-")
+    config.DATABASE_NAME = os.path.join(work_dir, "praypalbot.db")
+    config.LOG_FILENAME = os.path.join(work_dir, "praypalbot.log")
+    config.LOG_LEVEL = "WARNING"
+    config.PROFILING_ENABLED = False
+    config.MUSLIMSALAT_API_URL = start_muslimsalat_stub(api_latency)
+    return work_dir
+
+
+def build_dispatcher(workers):
+    """Returns the real Dispatcher with the bot's handlers and a fake Bot."""
+    from telegram import Bot
+    from telegram.ext import Dispatcher, JobQueue
+    from telegram.utils.request import Request
+
+    from main import register_handlers
+
+    message_ids = itertools.count(1)
+
+    class FakeRequest(Request):
+        """Answers Bot API calls locally instead of sending them to Telegram."""
+
+        def post(self, url, data, timeout=None):
+            method = url.rsplit("/", 1)[-1]
+            if method == "getMe":
+                return {
+                    "id": 1,
+                    "is_bot": True,
+                    "first_name": "PrayPalBot",
+                    "username": "PrayPalBot",
+                }
+            if method == "sendMessage":
+                return {
+                    "message_id": next(message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": data["chat_id"], "type": "private"},
+                    "text": data["text"],
+                }
+            return True
+
+    bot = Bot("123456:HARNESS", request=FakeRequest())
+    job_queue = JobQueue()
+    dispatcher = Dispatcher(bot, Queue(), workers=workers, job_queue=job_queue)
+    job_queue.set_dispatcher(dispatcher)
+    register_handlers(dispatcher)
+    return dispatcher
+
+
+def make_update(update_id, chat_id, text):
+    """Returns a raw Telegram update for a private text message."""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+        ]
+    return {"update_id": update_id, "message": message}
+
+
+def generate_streams(users):
+    """Returns one update stream per synthetic user, each running every command."""
+    update_ids = itertools.count(1)
+    streams = []
+    for user in range(users):
+        chat_id = 100000 + user
+        texts = [
+            "/start",
+            LOCATIONS[user % len(LOCATIONS)],
+            str(5 + user % 30),
+            "/showsettings",
+            "/todayprayertimes",
+            "/nextsalat",
+            f"/addlocation {LOCATIONS[(user + 1) % len(LOCATIONS)]}",
+            "/skipprayer shurooq",
+            "/nextsalat",
+        ]
+        streams.append([make_update(next(update_ids), chat_id, text) for text in texts])
+    return streams
+
+
+def load_streams(path):
+    """Reads recorded raw updates (one JSON object per line), grouped by chat."""
+    streams = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                update = json.loads(line)
+                chat_id = update["message"]["chat"]["id"]
+                streams.setdefault(chat_id, []).append(update)
+    return list(streams.values())
+
+
+def label_for(update, previous_command):
+    """Names the update for the report, e.g. "/nextsalat" or "/start:message"."""
+    text = update["message"].get("text", "")
+    if text.startswith("/"):
+        return text.split()[0]
+    return f"{previous_command}:message" if previous_command else "message"
+
+
+class Pacer:
+    """Spaces calls to wait() so that they happen at most rate times a second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.perf_counter()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(self._next, time.perf_counter())
+            self._next = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def replay(dispatcher, streams, rate, concurrency):
+    """Feeds the streams to the dispatcher and returns latencies per label.
+
+    Updates of one stream are processed in order, streams run concurrently.
+    """
+    from telegram import Update
+
+    pacer = Pacer(rate)
+    latencies = {}
+    lock = threading.Lock()
+
+    def run_stream(stream):
+        previous_command = None
+        for raw_update in stream:
+            label = label_for(raw_update, previous_command)
+            if not label.endswith("message"):
+                previous_command = label
+            update = Update.de_json(raw_update, dispatcher.bot)
+
+            pacer.wait()
+            started = time.perf_counter()
+            dispatcher.process_update(update)
+            elapsed = time.perf_counter() - started
+
+            with lock:
+                latencies.setdefault(label, []).append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(run_stream, stream) for stream in streams]:
+            future.result()
+
+    return latencies
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def report(latencies, elapsed, errors):
+    total = sum(len(values) for values in latencies.values())
+    print(f"{'update':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, values in sorted(latencies.items()):
+        values = sorted(values)
+        print(
+            f"{label:<28}{len(values):>8}"
+            f"{percentile(values, 0.50) * 1000:>10.2f}"
+            f"{percentile(values, 0.95) * 1000:>10.2f}"
+            f"{percentile(values, 0.99) * 1000:>10.2f}"
+        )
+    print(f"\n{total} updates in {elapsed:.2f}s ({total / elapsed:,.1f} updates/s)")
+    print(f"Handler errors: {errors}")
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argument_parser.add_argument("--users", type=int, default=200)
+    argument_parser.add_argument(
+        "--rate", type=float, default=0, help="updates per second, 0 for unlimited"
+    )
+    argument_parser.add_argument("--concurrency", type=int, default=8)
+    argument_parser.add_argument(
+        "--updates", help="JSON lines file of recorded updates to replay"
+    )
+    argument_parser.add_argument(
+        "--api-latency", type=float, default=0.05, help="stub API latency in seconds"
+    )
+    argument_parser.add_argument("--workers", type=int, default=4)
+    args = argument_parser.parse_args()
+
+    work_dir = configure(args.api_latency)
+    dispatcher = build_dispatcher(args.workers)
+
+    errors = []
+    dispatcher.add_error_handler(lambda update, context: errors.append(context.error))
+
+    streams = (
+        load_streams(args.updates) if args.updates else generate_streams(args.users)
+    )
+
+    started = time.perf_counter()
+    latencies = replay(dispatcher, streams, args.rate, args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    report(latencies, elapsed, len(errors))
+    for error in errors[:3]:
+        print(f"  {error!r}")
+    print(f"Database and logs: {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
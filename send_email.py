@@ -2,14 +2,84 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
+import atexit
+import datetime
 import os
+import threading
 
+from config import (
+    ALERT_DIGEST_SECONDS,
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_STARTTLS,
+    SMTP_TIMEOUT_SECONDS,
+)
 from credentials import SENDER_EMAIL, SENDER_PASSWORD, RECIPIENTS
+from utils import logging
+
+logger = logging.getLogger(__name__)
+
+
+def open_smtp_connection():
+    """
+    Connects and logs in to the configured SMTP server.
+
+    Returns:
+        smtplib.SMTP: The connection, to be closed with quit().
+    """
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+    if SMTP_STARTTLS:
+        server.starttls()
+
+    # Login with sender credentials (consider using app passwords), local test
+    # servers usually do not offer authentication
+    server.ehlo_or_helo_if_needed()
+    if server.has_extn("auth"):
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
+
+
+def build_message(subject, message, file_path=None):
+    """
+    Builds a multipart email message with an optional attachment.
+
+    Args:
+        subject (str): The subject line of the email.
+        message (str): The body of the email message.
+        file_path (str, optional): The path to the file you want to attach. Defaults to None.
+
+    Returns:
+        MIMEMultipart: The message, ready to be sent.
+    """
+    # Create a multipart message for text and attachment (if provided)
+    msg = MIMEMultipart()
+    msg["From"] = SENDER_EMAIL
+    msg["To"] = RECIPIENTS
+    msg["Subject"] = subject
+
+    # Attach the text message
+    text_part = MIMEText(message, "plain")
+    msg.attach(text_part)
+
+    # Attach the file (if a valid path is provided)
+    if file_path and os.path.isfile(file_path):
+        with open(file_path, "rb") as f:
+            file_part = MIMEApplication(f.read(), "octet-stream")
+            file_part.add_header(
+                "Content-Disposition",
+                'attachment; filename="%s"' % os.path.basename(file_path),
+            )
+            msg.attach(file_part)
+
+    return msg
 
 
 def send_email(subject, message, file_path=None):
     """
-    Sends an email using Gmail's SMTP server with secure connection (TLS) and an optional attachment.
+    Sends an email using the configured SMTP server (Gmail with TLS by default) and an optional attachment.
+
+    This blocks the caller for a full SMTP handshake, use send_alert for error
+    notifications.
 
     Args:
         subject (str): The subject line of the email.
@@ -21,34 +91,10 @@ def send_email(subject, message, file_path=None):
     """
 
     try:
-        # Use Gmail's SMTP server with TLS encryption
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-
-        # Login with sender credentials (consider using app passwords)
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-
-        # Create a multipart message for text and attachment (if provided)
-        msg = MIMEMultipart()
-        msg["From"] = SENDER_EMAIL
-        msg["To"] = RECIPIENTS
-        msg["Subject"] = subject
-
-        # Attach the text message
-        text_part = MIMEText(message, "plain")
-        msg.attach(text_part)
-
-        # Attach the file (if a valid path is provided)
-        if file_path and os.path.isfile(file_path):
-            with open(file_path, "rb") as f:
-                file_part = MIMEApplication(f.read(), "octet-stream")
-                file_part.add_header(
-                    "Content-Disposition",
-                    'attachment; filename="%s"' % os.path.basename(file_path),
-                )
-                msg.attach(file_part)
+        server = open_smtp_connection()
 
         # Send the email
+        msg = build_message(subject, message, file_path)
         server.sendmail(SENDER_EMAIL, RECIPIENTS, msg.as_string())
 
         # Close the connection
@@ -57,5 +103,147 @@ def send_email(subject, message, file_path=None):
         return True
 
     except Exception as e:
-        print(f"Error sending email: {e}")
+        logger.error("Error sending email: %s", e)
         return False
+
+
+class AlertDigest:
+    """Collects error alerts and emails them as periodic digests.
+
+    alert() only records the alert and returns immediately. A background
+    thread flushes the collected alerts every interval seconds: identical
+    alerts are sent once with an occurrence count, and all emails of a flush
+    share a single SMTP session.
+    """
+
+    def __init__(self, interval=ALERT_DIGEST_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}  # (subject, message) -> occurrence details
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def alert(self, subject, message):
+        """Queues an alert for the next digest without blocking the caller."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            entry = self._pending.get((subject, message))
+            if entry:
+                entry["count"] += 1
+                entry["last_seen"] = now
+            else:
+                self._pending[(subject, message)] = {
+                    "count": 1,
+                    "first_seen": now,
+                    "last_seen": now,
+                }
+
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name="AlertDigest", daemon=True
+                )
+                self._thread.start()
+
+    def flush(self):
+        """Sends the pending alerts now, one email per subject.
+
+        Alerts that could not be sent are put back and retried by the next flush.
+
+        Returns:
+            bool: True if there was nothing to send or sending succeeded.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return True
+
+        digests = {}
+        for (subject, message), entry in pending.items():
+            digests.setdefault(subject, []).append((message, entry))
+
+        sent_subjects = set()
+        try:
+            server = open_smtp_connection()
+            try:
+                for subject, alerts in digests.items():
+                    msg = build_message(
+                        self._digest_subject(subject, alerts),
+                        self._digest_body(alerts),
+                    )
+                    server.sendmail(SENDER_EMAIL, RECIPIENTS, msg.as_string())
+                    sent_subjects.add(subject)
+            finally:
+                server.quit()
+            return True
+        except Exception as e:
+            logger.error("Error sending alert digest: %s", e)
+            self._requeue(
+                {
+                    key: entry
+                    for key, entry in pending.items()
+                    if key[0] not in sent_subjects
+                }
+            )
+            return False
+
+    def stop(self):
+        """Stops the background thread and sends whatever is still pending.
+
+        Waits at most SMTP_TIMEOUT_SECONDS for a flush in progress so that an
+        unresponsive SMTP server cannot hold up exiting. flush() takes the
+        pending alerts under the lock, so it is safe to run alongside it.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(SMTP_TIMEOUT_SECONDS)
+        self.flush()
+
+    def _requeue(self, pending):
+        # Merge with alerts recorded since the flush started
+        with self._lock:
+            for key, entry in pending.items():
+                current = self._pending.get(key)
+                if current:
+                    entry = {
+                        "count": entry["count"] + current["count"],
+                        "first_seen": min(entry["first_seen"], current["first_seen"]),
+                        "last_seen": max(entry["last_seen"], current["last_seen"]),
+                    }
+                self._pending[key] = entry
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    @staticmethod
+    def _digest_subject(subject, alerts):
+        total = sum(entry["count"] for _, entry in alerts)
+        return subject if total == 1 else f"{subject} ({total} occurrences)"
+
+    @staticmethod
+    def _digest_body(alerts):
+        sections = []
+        for message, entry in alerts:
+            sections.append(
+                f"{message}\n\n"
+                f"Occurrences: {entry['count']}\n"
+                f"First seen: {entry['first_seen'].isoformat()}\n"
+                f"Last seen: {entry['last_seen'].isoformat()}"
+            )
+        return "\n\n---\n\n".join(sections)
+
+
+alert_digest = AlertDigest()
+atexit.register(alert_digest.stop)
+
+
+def send_alert(subject, message):
+    """
+    Queues an error alert email. Repeated alerts are deduplicated and sent
+    together as a digest every ALERT_DIGEST_SECONDS seconds.
+
+    Args:
+        subject (str): The subject line of the email.
+        message (str): The body of the email message.
+    """
+    alert_digest.alert(subject, message)
@@ -0,0 +1,180 @@
+import threading
+
+PRAYER_NAMES = ("fajr", "shurooq", "dhuhr", "asr", "maghrib", "isha")
+
+
+class SubscriberIndex:
+    """In-memory index of the chats subscribed to each prayer reminder.
+
+    Chats are grouped into sets keyed by (location, prayer_name, lead_time),
+    with prayer opt-outs already applied, so the recipients of a reminder are
+    found with a single lookup. A lead_time of None stands for the reminder at
+    the exact prayer time (stored as 0 in the database). Reminders only need
+    to be scheduled once per key, however many chats share it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # (location, prayer_name, lead_time) -> set of chat IDs
+        self._keys_by_location = {}  # location -> set of (prayer_name, lead_time)
+        self._subscriptions = {}  # chat_id -> {location: set of lead times}
+        self._opt_outs = {}  # chat_id -> set of prayer names
+        self._quiet_hours = {}  # chat_id -> (start_minute, end_minute)
+
+    def load(self, subscriptions, opt_outs, quiet_hours):
+        """Replaces the index with the given database rows.
+
+        Args:
+            subscriptions (iterable): (chat_id, location, lead_time) rows.
+            opt_outs (iterable): (chat_id, prayer_name) rows.
+            quiet_hours (iterable): (chat_id, start_minute, end_minute) rows.
+        """
+        chats = {}
+        for chat_id, location, lead_time in subscriptions:
+            chat_subscriptions = chats.setdefault(chat_id, {})
+            chat_subscriptions.setdefault(location, set()).add(lead_time or None)
+
+        chat_opt_outs = {}
+        for chat_id, prayer_name in opt_outs:
+            chat_opt_outs.setdefault(chat_id, set()).add(prayer_name)
+
+        with self._lock:
+            self._subscribers = {}
+            self._keys_by_location = {}
+            self._subscriptions = {}
+            self._opt_outs = chat_opt_outs
+            self._quiet_hours = {
+                chat_id: (start_minute, end_minute)
+                for chat_id, start_minute, end_minute in quiet_hours
+            }
+            for chat_id, chat_subscriptions in chats.items():
+                self._add_chat(chat_id, chat_subscriptions)
+
+    def replace_chat(self, chat_id, subscriptions, opt_outs, quiet_hours):
+        """Replaces the entries of a single chat.
+
+        Args:
+            chat_id (int): The chat ID.
+            subscriptions (iterable): (location, lead_time) rows of the chat.
+            opt_outs (iterable): Names of the prayers the chat opted out of.
+            quiet_hours (tuple or None): (start_minute, end_minute) of the chat.
+
+        Returns:
+            set: Locations whose set of reminder keys changed and need to be
+                 rescheduled.
+        """
+        chat_subscriptions = {}
+        for location, lead_time in subscriptions:
+            chat_subscriptions.setdefault(location, set()).add(lead_time or None)
+
+        with self._lock:
+            before = self._location_keys(
+                set(self._subscriptions.get(chat_id, ())) | set(chat_subscriptions)
+            )
+            self._remove_chat(chat_id)
+            if opt_outs:
+                self._opt_outs[chat_id] = set(opt_outs)
+            if quiet_hours:
+                self._quiet_hours[chat_id] = tuple(quiet_hours)
+            self._add_chat(chat_id, chat_subscriptions)
+            return self._changed_locations(before)
+
+    def remove_chat(self, chat_id):
+        """Removes a chat, returns the locations that need to be rescheduled."""
+        with self._lock:
+            before = self._location_keys(self._subscriptions.get(chat_id, ()))
+            self._remove_chat(chat_id)
+            return self._changed_locations(before)
+
+    def subscribers(self, location, prayer_name, lead_time):
+        """Returns the chat IDs that receive the given reminder."""
+        with self._lock:
+            return frozenset(
+                self._subscribers.get((location, prayer_name, lead_time), ())
+            )
+
+    def reminder_keys(self, location):
+        """Returns the (prayer_name, lead_time) pairs with subscribers at location."""
+        with self._lock:
+            return set(self._keys_by_location.get(location, ()))
+
+    def locations(self):
+        """Returns every location with at least one subscriber."""
+        with self._lock:
+            return list(self._keys_by_location)
+
+    def location_count(self, chat_id):
+        """Returns the number of locations the chat is subscribed to."""
+        with self._lock:
+            return len(self._subscriptions.get(chat_id, ()))
+
+    def chat_count(self):
+        """Returns the number of chats with at least one subscription."""
+        with self._lock:
+            return len(self._subscriptions)
+
+    def is_quiet(self, chat_id, local_time):
+        """Returns True if local_time falls within the chat's quiet hours.
+
+        Quiet hours may wrap past midnight (e.g. 22:00 to 05:00), equal start
+        and end minutes mean no quiet hours.
+        """
+        quiet_hours = self._quiet_hours.get(chat_id)
+        if not quiet_hours:
+            return False
+        start_minute, end_minute = quiet_hours
+        minute = local_time.hour * 60 + local_time.minute
+        if start_minute <= end_minute:
+            return start_minute <= minute < end_minute
+        return minute >= start_minute or minute < end_minute
+
+    def _add_chat(self, chat_id, chat_subscriptions):
+        if not chat_subscriptions:
+            return
+        self._subscriptions[chat_id] = chat_subscriptions
+        opt_outs = self._opt_outs.get(chat_id, ())
+        for location, lead_times in chat_subscriptions.items():
+            for lead_time in lead_times:
+                for prayer_name in PRAYER_NAMES:
+                    if prayer_name in opt_outs:
+                        continue
+                    key = (location, prayer_name, lead_time)
+                    chat_ids = self._subscribers.get(key)
+                    if chat_ids is None:
+                        chat_ids = self._subscribers[key] = set()
+                        self._keys_by_location.setdefault(location, set()).add(
+                            (prayer_name, lead_time)
+                        )
+                    chat_ids.add(chat_id)
+
+    def _remove_chat(self, chat_id):
+        chat_subscriptions = self._subscriptions.pop(chat_id, {})
+        self._opt_outs.pop(chat_id, None)
+        self._quiet_hours.pop(chat_id, None)
+        for location, lead_times in chat_subscriptions.items():
+            for lead_time in lead_times:
+                for prayer_name in PRAYER_NAMES:
+                    key = (location, prayer_name, lead_time)
+                    chat_ids = self._subscribers.get(key)
+                    if chat_ids is None:
+                        continue
+                    chat_ids.discard(chat_id)
+                    if not chat_ids:
+                        del self._subscribers[key]
+                        keys = self._keys_by_location[location]
+                        keys.discard((prayer_name, lead_time))
+                        if not keys:
+                            del self._keys_by_location[location]
+
+    def _location_keys(self, locations):
+        return {
+            location: set(self._keys_by_location.get(location, ()))
+            for location in locations
+        }
+
+    def _changed_locations(self, before):
+        return {
+            location
+            for location, keys in before.items()
+            if self._keys_by_location.get(location, set()) != keys
+        }
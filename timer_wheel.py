@@ -0,0 +1,281 @@
+import datetime
+import itertools
+import threading
+
+import pytz
+
+
+class Reminder:
+    """A single one-shot prayer reminder for a location held by the timer wheel.
+
+    It is sent to every chat subscribed to its location, prayer and lead time.
+    """
+
+    __slots__ = (
+        "reminder_id",
+        "location",
+        "prayer_name",
+        "lead_time",
+        "timezone_offset",
+        "fire_time",
+        "bucket",
+    )
+
+    def __init__(
+        self,
+        reminder_id,
+        location,
+        prayer_name,
+        lead_time,
+        timezone_offset,
+        fire_time,
+    ):
+        self.reminder_id = reminder_id
+        self.location = location
+        self.prayer_name = prayer_name
+        self.lead_time = lead_time
+        self.timezone_offset = timezone_offset
+        self.fire_time = fire_time
+        self.bucket = minute_bucket(fire_time)
+
+    def __repr__(self):
+        return (
+            f"Reminder({self.reminder_id}, "
+            f"location={self.location}, prayer_name={self.prayer_name}, "
+            f"lead_time={self.lead_time}, fire_time={self.fire_time.isoformat()})"
+        )
+
+
+def minute_bucket(when):
+    """Returns the index of the UTC minute that contains the given aware datetime."""
+    return int(when.timestamp() // 60)
+
+
+def bucket_start(bucket):
+    """Returns the aware UTC datetime at which the given minute bucket starts."""
+    return datetime.datetime.fromtimestamp(bucket * 60, pytz.utc)
+
+
+class TimerWheel:
+    """Minute-bucketed store of one-shot reminders.
+
+    Reminders are grouped by the UTC minute they are due in, so inserting or
+    cancelling a reminder is a dictionary operation and everything due in a
+    tick is expired as one batch. A per-location index allows all reminders of
+    a location to be cancelled or inspected without scanning the whole wheel.
+
+    Counters for introspection (pending reminders per location and prayer,
+    the fullest bucket and late firings) are kept up to date on every change
+    so that reading them never iterates over the pending reminders.
+    """
+
+    def __init__(self, misfire_seconds=60):
+        """
+        Args:
+            misfire_seconds (int): Reminders expired later than this after their
+                fire time are counted as misfires.
+        """
+        self.misfire_seconds = misfire_seconds
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._buckets = {}  # minute index -> {reminder_id: Reminder}
+        self._by_location = {}  # location -> {reminder_id: Reminder}
+        self._last_tick = None
+        self._size = 0
+        self._counts = {}  # (location, prayer_name) -> pending reminders
+        self._buckets_by_size = {}  # bucket size -> set of minute indexes
+        self._max_bucket_size = 0
+        self._misfire_count = 0
+        self._oldest_misfire = None
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, location, prayer_name, lead_time, timezone_offset, fire_time):
+        """Adds a reminder due at fire_time (an aware datetime) and returns it."""
+        reminder = Reminder(
+            next(self._ids),
+            location,
+            prayer_name,
+            lead_time,
+            timezone_offset,
+            fire_time.astimezone(pytz.utc),
+        )
+        with self._lock:
+            if self._last_tick is not None and reminder.bucket <= self._last_tick:
+                # Already ticked past this minute, fire on the next tick instead
+                reminder.bucket = self._last_tick + 1
+            bucket = self._buckets.setdefault(reminder.bucket, {})
+            bucket[reminder.reminder_id] = reminder
+            self._resize_bucket(reminder.bucket, len(bucket) - 1, len(bucket))
+            self._by_location.setdefault(location, {})[reminder.reminder_id] = reminder
+            self._count(reminder, 1)
+        return reminder
+
+    def cancel(self, reminder):
+        """Removes a single reminder. Returns False if it was no longer pending."""
+        with self._lock:
+            if not self._remove_from_bucket(reminder):
+                return False
+            self._remove_from_location(reminder)
+            return True
+
+    def cancel_location(self, location):
+        """Removes every pending reminder of the given location and returns the count."""
+        with self._lock:
+            reminders = self._by_location.pop(location, {})
+            for reminder in reminders.values():
+                self._remove_from_bucket(reminder)
+            return len(reminders)
+
+    def pending_for_location(self, location):
+        """Returns the pending reminders of the given location, earliest first."""
+        with self._lock:
+            reminders = list(self._by_location.get(location, {}).values())
+        return sorted(reminders, key=lambda reminder: reminder.fire_time)
+
+    def expire(self, now=None):
+        """Pops and returns every reminder due at or before now, earliest first.
+
+        Args:
+            now (datetime, optional): Aware datetime of the tick. Defaults to the
+                current UTC time.
+
+        Returns:
+            list: The expired Reminder objects.
+        """
+        if now is None:
+            now = datetime.datetime.now(pytz.utc)
+        current = minute_bucket(now)
+
+        with self._lock:
+            last = self._last_tick
+            if last is not None and current - last <= len(self._buckets):
+                # Walk the minutes since the previous tick
+                due_buckets = range(last + 1, current + 1)
+            else:
+                # First tick or a long stall, cheaper to look at the occupied buckets
+                due_buckets = sorted(key for key in self._buckets if key <= current)
+            self._last_tick = current if last is None else max(last, current)
+
+            expired = []
+            for key in due_buckets:
+                bucket = self._buckets.pop(key, None)
+                if not bucket:
+                    continue
+                self._resize_bucket(key, len(bucket), 0)
+                for reminder in bucket.values():
+                    self._remove_from_location(reminder)
+                    self._count(reminder, -1)
+                    self._record_misfire(reminder, now)
+                    expired.append(reminder)
+
+        expired.sort(key=lambda reminder: reminder.fire_time)
+        return expired
+
+    def stats(self, now=None, histogram_minutes=60):
+        """Returns aggregated views of the pending reminders.
+
+        The cost depends on the number of distinct locations and prayers and
+        on histogram_minutes, not on the number of pending reminders.
+
+        Args:
+            now (datetime, optional): Aware datetime the histogram starts at.
+                Defaults to the current UTC time.
+            histogram_minutes (int): Number of minutes covered by the histogram.
+
+        Returns:
+            dict: Pending counts (total and per location and prayer), the
+                  number of reminders due in each of the next minutes, the
+                  minute with the most reminders and the misfire record.
+        """
+        if now is None:
+            now = datetime.datetime.now(pytz.utc)
+        current = minute_bucket(now)
+
+        with self._lock:
+            by_location = {}
+            for (location, prayer_name), count in self._counts.items():
+                by_location.setdefault(location, {})[prayer_name] = count
+
+            histogram = [
+                {
+                    "minute": bucket_start(key).isoformat(),
+                    "count": len(self._buckets.get(key, ())),
+                }
+                for key in range(current, current + histogram_minutes)
+            ]
+
+            busiest_minute = None
+            if self._max_bucket_size:
+                key = min(self._buckets_by_size[self._max_bucket_size])
+                busiest_minute = {
+                    "minute": bucket_start(key).isoformat(),
+                    "count": self._max_bucket_size,
+                }
+
+            return {
+                "pending": self._size,
+                "by_location": by_location,
+                "next_minutes": histogram,
+                "busiest_minute": busiest_minute,
+                "misfires": self._misfire_count,
+                "oldest_misfire": self._oldest_misfire,
+            }
+
+    def _count(self, reminder, delta):
+        key = (reminder.location, reminder.prayer_name)
+        count = self._counts.get(key, 0) + delta
+        if count:
+            self._counts[key] = count
+        else:
+            self._counts.pop(key, None)
+        self._size += delta
+
+    def _resize_bucket(self, key, old_size, new_size):
+        if old_size:
+            keys = self._buckets_by_size[old_size]
+            keys.discard(key)
+            if not keys:
+                del self._buckets_by_size[old_size]
+        if new_size:
+            self._buckets_by_size.setdefault(new_size, set()).add(key)
+        if new_size > self._max_bucket_size:
+            self._max_bucket_size = new_size
+        while (
+            self._max_bucket_size and self._max_bucket_size not in self._buckets_by_size
+        ):
+            self._max_bucket_size -= 1
+
+    def _record_misfire(self, reminder, now):
+        lateness = (now - reminder.fire_time).total_seconds()
+        if lateness <= self.misfire_seconds:
+            return
+        self._misfire_count += 1
+        if (
+            self._oldest_misfire is None
+            or lateness > self._oldest_misfire["late_seconds"]
+        ):
+            self._oldest_misfire = {
+                "location": reminder.location,
+                "prayer_name": reminder.prayer_name,
+                "fire_time": reminder.fire_time.isoformat(),
+                "late_seconds": round(lateness),
+            }
+
+    def _remove_from_bucket(self, reminder):
+        bucket = self._buckets.get(reminder.bucket)
+        if bucket is None or bucket.pop(reminder.reminder_id, None) is None:
+            return False
+        self._resize_bucket(reminder.bucket, len(bucket) + 1, len(bucket))
+        if not bucket:
+            del self._buckets[reminder.bucket]
+        self._count(reminder, -1)
+        return True
+
+    def _remove_from_location(self, reminder):
+        location_reminders = self._by_location.get(reminder.location)
+        if location_reminders is not None:
+            location_reminders.pop(reminder.reminder_id, None)
+            if not location_reminders:
+                del self._by_location[reminder.location]
@@ -1,14 +1,101 @@
-from cachetools import TTLCache
+from cachetools import LRUCache
+from logging.handlers import QueueHandler, QueueListener
 
+import atexit
+import datetime
+import json
 import logging
+import queue
+import random
+import sys
+
+from config import LOG_FILENAME, LOG_LEVEL, LOG_SAMPLE_RATES
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class EventSampler(logging.Filter):
+    """Keeps only a fraction of the records of each sampled event type."""
+
+    def __init__(self, sample_rates):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record):
+        rate = self.sample_rates.get(getattr(record, "event", None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+def setup_logging():
+    """Routes all log records through a queue to the log file and stdout.
+
+    Callers only enqueue records, the file and console writes happen on the
+    listener's background thread.
+
+    Returns:
+        QueueListener: The started listener, stopped automatically at exit.
+    """
+    file_handler = logging.FileHandler(LOG_FILENAME)
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(EventSampler(LOG_SAMPLE_RATES))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(LOG_LEVEL)
+    root_logger.addHandler(queue_handler)
+
+    # APScheduler logs every job run at INFO
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+
+    listener = QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def log_event(logger, level, event, message, **fields):
+    """Logs a structured event with the given fields if the level is enabled.
+
+    Args:
+        logger (logging.Logger): The logger to use.
+        level (int): The logging level, e.g. logging.INFO.
+        event (str): The event type, used for sampling (see LOG_SAMPLE_RATES).
+        message (str): Human readable message.
+        **fields: Extra values added to the JSON record.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"event": event, "fields": fields})
 
-from config import LOG_FILENAME
 
 # Configure logging
-logging.basicConfig(filename=LOG_FILENAME, level=logging.ERROR)
+log_listener = setup_logging()
 
-# Configure caching
-prayer_time_cache = TTLCache(
-    maxsize=100,  # Adjust max size if needed
-    ttl=24 * 60 * 60,  # Cache for 24 hours (24 hours * 60 minutes * 60 seconds)
+# Configure caching, entries stay valid until their date range runs out (see prayers.py)
+prayer_time_cache = LRUCache(
+    maxsize=1000,  # Adjust max size if needed
 )